@@ -0,0 +1,132 @@
+"""Walk cursor-paged endpoints to the end over mixed timestamp formats.
+
+    python benchmarks/check_pagination.py
+
+SQLite keeps timestamps as text in whichever format wrote them: the
+CURRENT_TIMESTAMP default gives 'YYYY-MM-DD HH:MM:SS', SQLAlchemy inserts
+add '.000000' or real microseconds. This builds a throwaway database
+holding all three, many rows sharing the same second, then follows
+next_cursor through /api/transactions and /api/daily-count. Every row
+must come back exactly once. Exits non-zero if any is skipped or repeated.
+"""
+import argparse
+import os
+import sys
+import tempfile
+from datetime import date, datetime, timedelta
+
+# Run from anywhere: the backend directory holds the src package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert
+
+from src.main import create_app
+from src.models.user import User, db
+from src.models.location import Location
+from src.models.supplier import Supplier
+from src.models.brand import Brand
+from src.models.product import Product
+from src.models.stock_transaction import StockTransaction
+from src.models.daily_count import DailyCount
+
+CHECK_PASSWORD = 'admin123'
+
+
+def build(rows_per_format):
+    """Insert ledger and count rows in every stored timestamp format"""
+    location = Location(name='Store 1', location_type='store')
+    brand = Brand(name='Check brand')
+    supplier = Supplier(name='Check supplier')
+    db.session.add_all([location, brand, supplier])
+    db.session.flush()
+    user = User(username='admin', email='admin@example.com', full_name='Admin',
+                role='admin', location_id=location.id)
+    user.set_password(CHECK_PASSWORD)
+    products = [Product(sku=f'CHK{i:03d}', name=f'Check {i}', unit='ชิ้น', brand_id=brand.id,
+                        supplier_id=supplier.id) for i in range(3)]
+    db.session.add(user)
+    db.session.add_all(products)
+    db.session.flush()
+
+    # CURRENT_TIMESTAMP default: whole seconds, no fraction
+    for i in range(rows_per_format):
+        db.session.add(StockTransaction(
+            transaction_type='stock_in', quantity=1, product_id=products[i % 3].id,
+            to_location_id=location.id, user_id=user.id
+        ))
+    db.session.flush()
+
+    # Core inserts: '.000000' and real microseconds, sharing a few seconds
+    second = datetime.utcnow().replace(microsecond=0)
+    rows = []
+    for i in range(rows_per_format * 2):
+        at = second - timedelta(seconds=i % 3)
+        if i % 2:
+            at = at.replace(microsecond=1000 * (i % 997) + 1)
+        rows.append({
+            'transaction_type': 'stock_in', 'quantity': 1, 'product_id': products[i % 3].id,
+            'to_location_id': location.id, 'user_id': user.id, 'created_at': at
+        })
+    db.session.execute(insert(StockTransaction.__table__), rows)
+
+    count_rows = [{
+        'count_date': date.today() - timedelta(days=i // 3), 'counted_quantity': i,
+        'calculated_usage': 0, 'product_id': products[i % 3].id,
+        'location_id': location.id, 'user_id': user.id
+    } for i in range(rows_per_format)]
+    db.session.execute(insert(DailyCount.__table__), count_rows)
+    db.session.commit()
+    return location.id
+
+
+def walk(client, headers, path, key):
+    """Follow next_cursor to the end; return (ids seen, total reported)"""
+    ids, cursor, total = [], '', None
+    while cursor is not None:
+        response = client.get(f'{path}&cursor={cursor}&include_total=true', headers=headers)
+        if response.status_code != 200:
+            raise SystemExit(f'{path}: HTTP {response.status_code} {response.get_data(as_text=True)}')
+        body = response.get_json()
+        ids.extend(item['id'] for item in body[key])
+        total, cursor = body['total'], body['next_cursor']
+    return ids, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=150, help='rows per timestamp format')
+    parser.add_argument('--per-page', type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(directory, 'check.db')}",
+            'BCRYPT_LOG_ROUNDS': 4,
+            'TESTING': True
+        })
+        with app.app_context():
+            db.create_all()
+            location_id = build(args.rows)
+            db.engine.dispose()
+
+        client = app.test_client()
+        token = client.post('/api/login', json={'username': 'admin', 'password': CHECK_PASSWORD}).get_json()['token']
+        headers = {'Authorization': f'Bearer {token}'}
+
+        failed = False
+        for path, key in (
+            (f'/api/transactions?location_id={location_id}&per_page={args.per_page}', 'transactions'),
+            (f'/api/daily-count?location_id={location_id}&per_page={args.per_page}', 'daily_counts'),
+        ):
+            ids, total = walk(client, headers, path, key)
+            ok = len(ids) == total and len(set(ids)) == len(ids)
+            failed = failed or not ok
+            print(f"{'ok  ' if ok else 'FAIL'} {path}: {len(set(ids))} distinct of {total} rows in {len(ids)} returned")
+
+        with app.app_context():
+            db.engine.dispose()
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,242 @@
+"""Build a synthetic retail dataset for benchmarks.
+
+    python benchmarks/generate_dataset.py --database-url sqlite:///bench.db \\
+        --products 500 --locations 5 --days 60
+
+One warehouse supplies M-1 stores over D days ending yesterday. The
+warehouse receives weekly deliveries, stores get transfers every few
+days and count every product every evening, with the usage booked to
+the ledger. Inventory ends at what the ledger adds up to, and the
+derived tables (stock summary, movement rollup, search index, month-end
+snapshots) are built as init-db and the scheduled commands would. The
+same arguments and --seed always produce the same rows.
+"""
+import argparse
+import os
+import random
+import secrets
+import sys
+import time as clock
+from datetime import date, datetime, time, timedelta
+
+# Run from anywhere: the backend directory holds the src package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert
+
+from src.main import create_app
+from src.models.user import User, db
+from src.models.location import Location
+from src.models.supplier import Supplier
+from src.models.brand import Brand
+from src.models.product import Product
+from src.models.inventory import Inventory
+from src.models.stock_transaction import StockTransaction
+from src.models.daily_count import DailyCount
+from src.services.stock_summary import rebuild_stock_summary
+from src.services.movements import rebuild_daily_movements
+from src.services.search import ensure_search_index, rebuild_search_index
+from src.services.snapshots import take_snapshot
+
+BATCH_SIZE = 5000
+
+# Product names mix Thai and English so search is exercised on both
+NAME_WORDS = (
+    ('ข้าว', 'น้ำมัน', 'น้ำตาล', 'ซอส', 'นม', 'กาแฟ', 'ชา', 'ไข่', 'แป้ง', 'เกลือ'),
+    ('Rice', 'Oil', 'Sugar', 'Sauce', 'Milk', 'Coffee', 'Tea', 'Egg', 'Flour', 'Salt'),
+)
+NAME_SIZES = ('เล็ก', 'กลาง', 'ใหญ่', 'Small', 'Medium', 'Large', 'Pack', 'Box')
+UNITS = ('ชิ้น', 'กิโลกรัม', 'ลิตร', 'แพ็ค', 'กล่อง')
+
+DELIVERY_EVERY_DAYS = 7
+TRANSFER_EVERY_DAYS = 3
+BENCHMARK_PASSWORD = 'admin123'
+
+
+def _insert(model, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        db.session.execute(insert(model.__table__), rows[start:start + BATCH_SIZE])
+
+
+def _at(day, hour, rng):
+    return datetime.combine(day, time(hour, rng.randrange(60), rng.randrange(60)))
+
+
+def generate(products=500, locations=5, days=60, seed=1):
+    """Insert the dataset into the app's (empty) database and return row counts"""
+    rng = random.Random(seed)
+    today = date.today()
+    first_day = today - timedelta(days=days)
+
+    brand_rows = [{'name': f'Brand {i + 1}', 'description': None}
+                  for i in range(max(5, products // 50))]
+    supplier_rows = [{'name': f'Supplier {i + 1}', 'contact_person': f'Contact {i + 1}',
+                      'phone': f'02-000-{i:04d}', 'email': f'supplier{i + 1}@example.com'}
+                     for i in range(max(3, products // 100))]
+    location_rows = [{'name': 'Central Warehouse', 'location_type': 'warehouse', 'address': 'Warehouse'}]
+    location_rows += [{'name': f'Store {i}', 'location_type': 'store', 'address': f'Store {i}'}
+                      for i in range(1, max(2, locations))]
+    _insert(Brand, brand_rows)
+    _insert(Supplier, supplier_rows)
+    _insert(Location, location_rows)
+
+    brand_ids = [row.id for row in db.session.query(Brand.id).order_by(Brand.id)]
+    supplier_ids = [row.id for row in db.session.query(Supplier.id).order_by(Supplier.id)]
+    location_ids = [row.id for row in db.session.query(Location.id).order_by(Location.id)]
+    warehouse_id, store_ids = location_ids[0], location_ids[1:]
+
+    admin = User(username='admin', email='admin@example.com', full_name='System Administrator', role='admin')
+    admin.set_password(BENCHMARK_PASSWORD)
+    db.session.add(admin)
+    db.session.flush()
+    user_rows = [{
+        'username': f'staff{location_id}', 'email': f'staff{location_id}@example.com',
+        'password_hash': admin.password_hash, 'full_name': f'Staff {location_id}',
+        'role': 'staff', 'location_id': location_id
+    } for location_id in store_ids]
+    _insert(User, user_rows)
+    staff_ids = dict(db.session.query(User.location_id, User.id).filter(User.location_id.isnot(None)))
+
+    product_rows = []
+    for i in range(products):
+        words = NAME_WORDS[i % 2]
+        product_rows.append({
+            'sku': f'SKU{i + 1:06d}',
+            'name': f'{rng.choice(words)} {rng.choice(NAME_SIZES)} {i + 1}',
+            'category': words[i % len(words)],
+            'unit': rng.choice(UNITS),
+            'reorder_point': rng.randrange(5, 50),
+            'brand_id': rng.choice(brand_ids),
+            'supplier_id': rng.choice(supplier_ids)
+        })
+    _insert(Product, product_rows)
+    product_ids = [row.id for row in db.session.query(Product.id).order_by(Product.id)]
+    # Some products sell far faster than others
+    daily_demand = {product_id: rng.choice((0, 1, 1, 2, 3, 5, 8)) for product_id in product_ids}
+
+    stock = {}
+    ledger = []
+    counts = []
+
+    def book(product_id, location_id, quantity, transaction_type, user_id, created_at, notes=None):
+        key = (location_id, product_id)
+        stock[key] = stock.get(key, 0) + quantity
+        ledger.append({
+            'product_id': product_id,
+            'from_location_id': location_id if quantity < 0 else None,
+            'to_location_id': location_id if quantity >= 0 else None,
+            'user_id': user_id,
+            'transaction_type': transaction_type,
+            'quantity': quantity,
+            'notes': notes,
+            'created_at': created_at
+        })
+
+    for offset in range(days):
+        day = first_day + timedelta(days=offset)
+
+        if offset % DELIVERY_EVERY_DAYS == 0:
+            for product_id in product_ids:
+                quantity = (daily_demand[product_id] * len(store_ids) + 1) * DELIVERY_EVERY_DAYS
+                book(product_id, warehouse_id, quantity + rng.randrange(10), 'stock_in', admin.id,
+                     _at(day, 8, rng), 'Weekly delivery')
+
+        for store_id in store_ids:
+            if (offset + store_id) % TRANSFER_EVERY_DAYS == 0:
+                for product_id in product_ids:
+                    on_hand = stock.get((warehouse_id, product_id), 0)
+                    quantity = min(on_hand, daily_demand[product_id] * TRANSFER_EVERY_DAYS + rng.randrange(3))
+                    if quantity > 0:
+                        moved_at = _at(day, 10, rng)
+                        book(product_id, warehouse_id, -quantity, 'transfer_out', admin.id, moved_at)
+                        book(product_id, store_id, quantity, 'transfer_in', admin.id, moved_at)
+
+            counted_at = _at(day, 21, rng)
+            for product_id in product_ids:
+                on_hand = stock.get((store_id, product_id), 0)
+                usage = min(on_hand, rng.randrange(daily_demand[product_id] * 2 + 1))
+                if usage:
+                    book(product_id, store_id, -usage, 'daily_usage', staff_ids[store_id], counted_at,
+                         f'Daily usage for {day}')
+                counts.append({
+                    'product_id': product_id,
+                    'location_id': store_id,
+                    'user_id': staff_ids[store_id],
+                    'count_date': day,
+                    'counted_quantity': on_hand - usage,
+                    'calculated_usage': usage,
+                    'created_at': counted_at
+                })
+
+    _insert(StockTransaction, ledger)
+    _insert(DailyCount, counts)
+    _insert(Inventory, [
+        {'location_id': location_id, 'product_id': product_id, 'quantity': quantity}
+        for (location_id, product_id), quantity in sorted(stock.items())
+    ])
+
+    rebuild_stock_summary()
+    rebuild_daily_movements()
+    db.session.commit()
+
+    ensure_search_index()
+    rebuild_search_index()
+    db.session.commit()
+
+    # Month-end snapshots, as a monthly take-inventory-snapshot would leave
+    month_start = date(first_day.year, first_day.month, 1)
+    while True:
+        month_start = (month_start + timedelta(days=32)).replace(day=1)
+        if month_start >= today:
+            break
+        take_snapshot(month_start - timedelta(days=1))
+    db.session.commit()
+
+    return {
+        'brands': len(brand_rows),
+        'suppliers': len(supplier_rows),
+        'locations': len(location_rows),
+        'users': len(user_rows) + 1,
+        'products': len(product_rows),
+        'inventory': len(stock),
+        'stock_transactions': len(ledger),
+        'daily_counts': len(counts)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate a synthetic retail dataset for benchmarks.')
+    parser.add_argument('--database-url', required=True,
+                        help='Target database, e.g. sqlite:///bench.db; never point this at live data.')
+    parser.add_argument('--products', type=int, default=500)
+    parser.add_argument('--locations', type=int, default=5, help='Locations including the warehouse.')
+    parser.add_argument('--days', type=int, default=60, help='Days of history ending yesterday.')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--reset', action='store_true', help='Drop and recreate all tables first.')
+    args = parser.parse_args(argv)
+
+    # A fast hash keeps generation quick; benchmarks log in with it too
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': args.database_url,
+        'BCRYPT_LOG_ROUNDS': 4,
+        'SECRET_KEY': secrets.token_hex(32),
+    })
+
+    with app.app_context():
+        if args.reset:
+            db.drop_all()
+        db.create_all()
+        if db.session.query(Product.id).first() is not None:
+            parser.error('the database already has products; pass --reset to replace them')
+
+        started = clock.perf_counter()
+        rows = generate(args.products, args.locations, args.days, args.seed)
+        elapsed = clock.perf_counter() - started
+
+    for table, count in rows.items():
+        print(f'{table:>20}: {count}')
+    print(f'Generated in {elapsed:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,301 @@
+"""Time every read endpoint against a generated dataset.
+
+    python benchmarks/generate_dataset.py --database-url sqlite:///bench.db
+    python benchmarks/run.py --database-url sqlite:///bench.db --output before.json
+    # ...change code...
+    python benchmarks/run.py --database-url sqlite:///bench.db --output after.json --compare before.json
+
+Each case runs through the Flask test client: one warm-up request, then
+--repeat timed requests for p50/p95 latency and SQL statement counts,
+then one more under tracemalloc for peak Python memory (kept apart so
+tracing does not skew the timings). Results go to a JSON file tagged
+with the git commit. GET routes without a case are listed so new
+endpoints are not silently left out.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import secrets
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+# Run from anywhere: the backend directory holds the src package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event, func
+
+from src.main import create_app
+from src.models.user import db
+from src.models.location import Location
+from src.models.product import Product
+from src.models.stock_transaction import StockTransaction
+from src.models.daily_count import DailyCount
+from src.models.inventory import Inventory
+
+BENCHMARK_USER = ('admin', 'admin123')
+
+# name -> path; placeholders are filled from the dataset (see _placeholders)
+CASES = {
+    'auth.me': '/api/me',
+    'user.list': '/api/users',
+    'user.get': '/api/users/{user_id}',
+    'location.list': '/api/locations',
+    'location.get': '/api/locations/{store_id}',
+    'supplier.list': '/api/suppliers',
+    'supplier.get': '/api/suppliers/{supplier_id}',
+    'brand.list': '/api/brands',
+    'brand.get': '/api/brands/{brand_id}',
+    'product.list': '/api/products?page=1&per_page=50',
+    'product.search_thai': '/api/products?search=%E0%B8%81%E0%B8%B2%E0%B9%81%E0%B8%9F&per_page=50',
+    'product.search_sku': '/api/products?search=SKU0001&per_page=50',
+    'product.get': '/api/products/{product_id}',
+    'inventory.list': '/api/inventory?location_id={store_id}',
+    'inventory.low_stock': '/api/inventory?location_id={store_id}&low_stock=true',
+    'inventory.get': '/api/inventory/{product_id}/{store_id}',
+    'inventory.summary': '/api/inventory/summary',
+    'inventory.as_of': '/api/inventory/as-of?location_id={store_id}&at={mid_date}',
+    'transaction.list': '/api/transactions?per_page=50',
+    'transaction.cursor': '/api/transactions?cursor=&per_page=50&location_id={store_id}',
+    'transaction.get': '/api/transactions/{transaction_id}',
+    'transaction.export_csv': '/api/transactions/export?format=csv&location_id={store_id}'
+                              '&start_date={week_ago}&end_date={today}',
+    'daily_count.list': '/api/daily-count?per_page=50&location_id={store_id}',
+    'daily_count.summary': '/api/daily-count/summary?location_id={store_id}'
+                           '&start_date={month_ago}&end_date={today}',
+    'dashboard.bundle': '/api/dashboard/bundle',
+    'dashboard.bundle_store': '/api/dashboard/bundle?location_id={store_id}',
+    'dashboard.overview': '/api/dashboard/overview',
+    'dashboard.recent_activities': '/api/dashboard/recent-activities',
+    'dashboard.low_stock_items': '/api/dashboard/low-stock-items',
+    'dashboard.daily_usage_trend': '/api/dashboard/daily-usage-trend',
+    'dashboard.top_products': '/api/dashboard/top-products',
+    'reports.low_stock': '/api/reports/low-stock',
+    'reports.purchase_suggestion': '/api/reports/purchase-suggestion?warehouse_id={warehouse_id}',
+    # Without granularity every ledger row in the range is listed
+    'reports.inventory_movement': '/api/reports/inventory-movement?start_date={week_ago}&end_date={today}',
+    'reports.inventory_movement_day': '/api/reports/inventory-movement?start_date={month_ago}'
+                                      '&end_date={today}&granularity=day',
+    'reports.inventory_movement_week': '/api/reports/inventory-movement?start_date={month_ago}'
+                                       '&end_date={today}&granularity=week',
+    'reports.inventory_movement_export': '/api/reports/inventory-movement/export?format=ndjson'
+                                         '&start_date={week_ago}&end_date={today}',
+    'reports.stock_summary': '/api/reports/stock-summary',
+    'reports.usage_analysis': '/api/reports/usage-analysis?days=30',
+    'health': '/api/health',
+    'health.ready': '/api/health/ready',
+    'health.live': '/api/health/live',
+    'metrics': '/api/metrics',
+}
+
+# GET routes deliberately left out
+SKIPPED_RULES = {
+    '/api/reports/jobs/<job_id>',  # polls a job submitted by POST
+}
+
+
+def _placeholders():
+    """Ids and dates the case paths refer to, taken from the dataset"""
+    warehouse = Location.query.filter_by(location_type='warehouse').order_by(Location.id).first()
+    store = Location.query.filter_by(location_type='store').order_by(Location.id).first()
+    last_count = db.session.query(func.max(DailyCount.count_date)).scalar() or date.today()
+    first_count = db.session.query(func.min(DailyCount.count_date)).scalar() or last_count
+    # The busiest product, so per-product endpoints have data to chew on
+    product_id = db.session.query(Inventory.product_id).order_by(Inventory.quantity.desc()).limit(1).scalar()
+    return {
+        'user_id': 1,
+        'brand_id': 1,
+        'supplier_id': 1,
+        'warehouse_id': warehouse.id if warehouse else 1,
+        'store_id': store.id if store else 1,
+        'product_id': product_id or db.session.query(func.min(Product.id)).scalar() or 1,
+        'transaction_id': db.session.query(func.max(StockTransaction.id)).scalar() or 1,
+        'today': last_count.isoformat(),
+        'week_ago': (last_count - timedelta(days=7)).isoformat(),
+        'month_ago': (last_count - timedelta(days=30)).isoformat(),
+        'mid_date': (first_count + (last_count - first_count) / 2).isoformat(),
+    }
+
+
+def _dataset_counts():
+    return {
+        'locations': Location.query.count(),
+        'products': Product.query.count(),
+        'inventory': Inventory.query.count(),
+        'stock_transactions': StockTransaction.query.count(),
+        'daily_counts': DailyCount.query.count(),
+    }
+
+
+def _percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an ascending list"""
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _uncovered_routes(app):
+    covered = {path.split('?')[0] for path in CASES.values()}
+    uncovered = []
+    for rule in app.url_map.iter_rules():
+        if 'GET' not in rule.methods or not rule.rule.startswith('/api/') or rule.rule in SKIPPED_RULES:
+            continue
+        # Match /api/products/<int:product_id> against /api/products/{product_id}
+        pattern = rule.rule
+        for argument in rule.arguments:
+            pattern = pattern.replace(f'<int:{argument}>', '*').replace(f'<{argument}>', '*')
+        if not any(_matches(pattern, path) for path in covered):
+            uncovered.append(rule.rule)
+    return sorted(uncovered)
+
+
+def _matches(pattern, path):
+    pattern_parts, path_parts = pattern.split('/'), path.split('/')
+    return len(pattern_parts) == len(path_parts) and all(
+        expected == '*' or expected == actual for expected, actual in zip(pattern_parts, path_parts)
+    )
+
+
+def run_benchmarks(app, repeat=20, only=None):
+    """Time each case and return {name: figures}"""
+    statements = {'count': 0}
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        statements['count'] += 1
+
+    client = app.test_client()
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', _count)
+        values = _placeholders()
+        dataset = _dataset_counts()
+
+    response = client.post('/api/login', json={'username': BENCHMARK_USER[0], 'password': BENCHMARK_USER[1]})
+    if response.status_code != 200:
+        raise SystemExit(f'Login as {BENCHMARK_USER[0]} failed ({response.status_code}); was the dataset generated?')
+    headers = {'Authorization': f"Bearer {response.get_json()['token']}", 'Accept-Encoding': 'gzip'}
+
+    results = {}
+    for name, template in CASES.items():
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        path = template.format(**values)
+
+        # The warm-up fills caches and compiles statements, as a live worker would have
+        client.get(path, headers=headers).close()
+
+        timings = []
+        sql_counts = []
+        for _ in range(repeat):
+            statements['count'] = 0
+            started = time.perf_counter()
+            response = client.get(path, headers=headers)
+            body = response.get_data()
+            timings.append(time.perf_counter() - started)
+            sql_counts.append(statements['count'])
+            response.close()
+
+        tracemalloc.start()
+        client.get(path, headers=headers).get_data()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        timings.sort()
+        results[name] = {
+            'path': path,
+            'status': response.status_code,
+            'p50_ms': round(_percentile(timings, 0.50) * 1000, 3),
+            'p95_ms': round(_percentile(timings, 0.95) * 1000, 3),
+            'mean_ms': round(sum(timings) / len(timings) * 1000, 3),
+            'sql_statements': max(sql_counts),
+            'response_bytes': len(body),
+            'peak_memory_kb': round(peak / 1024, 1),
+        }
+        print(f"{name:<36} {response.status_code} p50 {results[name]['p50_ms']:>9.2f} ms"
+              f"  p95 {results[name]['p95_ms']:>9.2f} ms  sql {results[name]['sql_statements']:>4}"
+              f"  peak {results[name]['peak_memory_kb']:>9.1f} KB")
+
+    return dataset, results
+
+
+def compare(baseline, current):
+    """Print p50/p95 and SQL changes against an earlier results file"""
+    print(f"\nChange vs {baseline['meta'].get('commit') or 'baseline'}:")
+    for name, figures in current['endpoints'].items():
+        before = baseline['endpoints'].get(name)
+        if not before:
+            print(f'{name:<36} new')
+            continue
+        changes = []
+        for key in ('p50_ms', 'p95_ms'):
+            if before[key]:
+                changes.append(f'{key[:3]} {(figures[key] / before[key] - 1) * 100:+7.1f}%')
+        if figures['sql_statements'] != before['sql_statements']:
+            changes.append(f"sql {before['sql_statements']} -> {figures['sql_statements']}")
+        print(f"{name:<36} {'  '.join(changes)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the API against a generated dataset.')
+    parser.add_argument('--database-url', required=True, help='Database built by generate_dataset.py.')
+    parser.add_argument('--repeat', type=int, default=20, help='Timed requests per case.')
+    parser.add_argument('--only', action='append', help='Run only cases whose name starts with this (repeatable).')
+    parser.add_argument('--output', help='Results file (default: benchmarks/results/<commit>.json).')
+    parser.add_argument('--compare', help='Earlier results file to compare against.')
+    args = parser.parse_args(argv)
+
+    # The dashboard cache is switched off so its queries are what gets timed
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': args.database_url,
+        'BCRYPT_LOG_ROUNDS': 4,
+        'DASHBOARD_CACHE_TTL': 0,
+        'SECRET_KEY': secrets.token_hex(32),
+    })
+    dataset, endpoints = run_benchmarks(app, repeat=args.repeat, only=args.only)
+
+    with app.app_context():
+        dialect = db.engine.dialect.name
+    commit = _git_commit()
+    uncovered = _uncovered_routes(app)
+    results = {
+        'meta': {
+            'commit': commit,
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'database': dialect,
+            'repeat': args.repeat,
+            'dataset': dataset,
+            'uncovered_routes': uncovered,
+        },
+        'endpoints': endpoints,
+    }
+
+    output = args.output or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'results', f"{commit or 'results'}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f'\nResults written to {output}')
+    if uncovered:
+        print('GET routes without a benchmark case: ' + ', '.join(uncovered))
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(json.load(f), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+import click
+from sqlalchemy import inspect, text
+from src.models.user import User, db
+from src.models.location import Location
+from src.models.stock_transaction import StockTransaction
+from src.services.stock_summary import ensure_stock_summary, rebuild_stock_summary
+from src.services.search import ensure_search_index, rebuild_search_index
+from src.services.movements import ensure_daily_movements, rebuild_daily_movements
+from src.services.snapshots import take_snapshot
+from src.services.report_jobs import purge_report_jobs
+from datetime import date
+
+
+def seed_initial_data():
+    """Create the default locations and admin user on an empty database"""
+    if Location.query.count() > 0:
+        return False
+
+    # Create default locations
+    central_warehouse = Location(
+        name='Central Warehouse',
+        location_type='warehouse',
+        address='123 Main St, City',
+        is_active=True
+    )
+    store_a = Location(
+        name='Store A',
+        location_type='store',
+        address='456 Store St, City',
+        is_active=True
+    )
+    store_b = Location(
+        name='Store B',
+        location_type='store',
+        address='789 Shop Ave, City',
+        is_active=True
+    )
+
+    db.session.add_all([central_warehouse, store_a, store_b])
+    db.session.commit()
+
+    # Create default admin user
+    admin_user = User(
+        username='admin',
+        email='admin@example.com',
+        full_name='System Administrator',
+        role='admin',
+        is_active=True
+    )
+    admin_user.set_password('admin123')
+
+    db.session.add(admin_user)
+    db.session.commit()
+    return True
+
+
+# Columns added to existing tables: (table, column, DDL type and default).
+# create_all() only creates missing tables, so these are added on upgrade.
+ADDED_COLUMNS = (
+    ('users', 'token_version', 'INTEGER NOT NULL DEFAULT 0'),
+)
+
+
+def add_missing_columns():
+    """ALTER TABLE ... ADD COLUMN for each ADDED_COLUMNS entry a table lacks"""
+    inspector = inspect(db.engine)
+    added = []
+    for table, column, ddl in ADDED_COLUMNS:
+        if not inspector.has_table(table):
+            continue
+        if column in {existing['name'] for existing in inspector.get_columns(table)}:
+            continue
+        db.session.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {ddl}'))
+        added.append(f'{table}.{column}')
+    db.session.commit()
+    return added
+
+
+# Ledger types renamed to fit transaction_type's String(20): (old, new)
+RENAMED_TRANSACTION_TYPES = (
+    ('daily_usage_adjustment', 'count_adjustment'),
+)
+
+
+def rename_transaction_types():
+    """Rewrite renamed ledger types and rebuild the rollup if any changed"""
+    renamed = 0
+    for old, new in RENAMED_TRANSACTION_TYPES:
+        renamed += StockTransaction.query.filter_by(transaction_type=old).update(
+            {'transaction_type': new}, synchronize_session=False
+        )
+    if renamed:
+        rebuild_daily_movements()
+    db.session.commit()
+    return renamed
+
+
+def add_missing_indexes():
+    """Create model indexes an existing table lacks; create_all() skips existing tables"""
+    inspector = inspect(db.engine)
+    added = []
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(db.engine)
+                added.append(index.name)
+    return added
+
+
+def init_database(seed=True):
+    """Bring the schema and ledger types up to date, seed an empty database and build derived tables"""
+    db.create_all()
+    for column in add_missing_columns():
+        click.echo(f'Added column {column}')
+    for index in add_missing_indexes():
+        click.echo(f'Added index {index}')
+    renamed = rename_transaction_types()
+    if renamed:
+        click.echo(f'Renamed the type of {renamed} ledger rows')
+    if seed and seed_initial_data():
+        click.echo('Initial data seeded successfully!')
+
+    # Databases created before the derived tables existed get them built once
+    ensure_stock_summary()
+    ensure_daily_movements()
+    ensure_search_index()
+
+
+def register_commands(app):
+    """Attach the maintenance commands, run once per deploy rather than per worker"""
+
+    @app.cli.command('init-db')
+    @click.option('--seed/--no-seed', default=True, help='Seed default locations and admin user when empty.')
+    def init_db_command(seed):
+        """Create tables and seed initial data."""
+        init_database(seed=seed)
+        click.echo('Database ready.')
+
+    @app.cli.command('rebuild-stock-summary')
+    def rebuild_stock_summary_command():
+        """Recompute the per-location stock summary from inventory."""
+        rebuild_stock_summary()
+        db.session.commit()
+        click.echo('Stock summary rebuilt.')
+
+    @app.cli.command('rebuild-movement-rollup')
+    def rebuild_movement_rollup_command():
+        """Recompute the daily stock movement rollup from the ledger."""
+        rebuild_daily_movements()
+        db.session.commit()
+        click.echo('Movement rollup rebuilt.')
+
+    @app.cli.command('take-inventory-snapshot')
+    @click.option('--date', 'snapshot_date', default=None, help='Day to snapshot (YYYY-MM-DD); defaults to yesterday.')
+    def take_inventory_snapshot_command(snapshot_date):
+        """Record end-of-day stock for every location; schedule daily or monthly."""
+        snapshot = take_snapshot(date.fromisoformat(snapshot_date) if snapshot_date else None)
+        db.session.commit()
+        click.echo(f'Inventory snapshot taken for {snapshot.snapshot_date}.')
+
+    @app.cli.command('purge-report-jobs')
+    @click.option('--days', default=7, show_default=True, help='Delete jobs created more than this many days ago.')
+    def purge_report_jobs_command(days):
+        """Delete old background report jobs and their stored results."""
+        deleted = purge_report_jobs(days)
+        db.session.commit()
+        click.echo(f'{deleted} report jobs deleted.')
+
+    @app.cli.command('rebuild-search-index')
+    def rebuild_search_index_command():
+        """Refill the product search index from products."""
+        ensure_search_index()
+        rebuild_search_index()
+        db.session.commit()
+        click.echo('Search index rebuilt.')
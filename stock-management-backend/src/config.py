@@ -0,0 +1,81 @@
+import os
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+DEFAULT_SQLITE_PATH = os.path.join(os.path.dirname(__file__), 'database', 'app.db')
+
+
+def _env_int(environ, name, default):
+    return int(environ.get(name, default))
+
+
+def _env_bool(environ, name, default):
+    return str(environ.get(name, default)).lower() in ('1', 'true', 'yes', 'on')
+
+
+def database_uri(environ=os.environ):
+    """DATABASE_URL, or the bundled SQLite file for development"""
+    uri = environ.get('DATABASE_URL') or f'sqlite:///{DEFAULT_SQLITE_PATH}'
+    # Heroku-style URLs use a scheme SQLAlchemy no longer accepts
+    if uri.startswith('postgres://'):
+        uri = 'postgresql://' + uri[len('postgres://'):]
+    return uri
+
+
+def database_config(uri=None, environ=os.environ):
+    """Flask-SQLAlchemy settings for a database URI (DATABASE_URL by default).
+
+    PostgreSQL gets a sized connection pool with pre-ping, recycling and a
+    server-side statement_timeout. SQLite keeps SQLAlchemy's default pool
+    and is tuned through the pragmas applied by configure_engine().
+    """
+    uri = uri or database_uri(environ)
+    backend = make_url(uri).get_backend_name()
+    config = {'SQLALCHEMY_DATABASE_URI': uri}
+
+    if backend == 'sqlite':
+        config['SQLALCHEMY_ENGINE_OPTIONS'] = {}
+        config['SQLITE_PRAGMAS'] = {
+            'journal_mode': environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+            'synchronous': environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+            'busy_timeout': _env_int(environ, 'SQLITE_BUSY_TIMEOUT_MS', 5000),
+            # Negative cache_size is in KiB rather than pages
+            'cache_size': -_env_int(environ, 'SQLITE_CACHE_SIZE_KB', 64 * 1024),
+            'mmap_size': _env_int(environ, 'SQLITE_MMAP_SIZE', 256 * 1024 * 1024),
+        }
+        return config
+
+    engine_options = {
+        'pool_size': _env_int(environ, 'DB_POOL_SIZE', 10),
+        'max_overflow': _env_int(environ, 'DB_MAX_OVERFLOW', 20),
+        'pool_timeout': _env_int(environ, 'DB_POOL_TIMEOUT', 30),
+        'pool_recycle': _env_int(environ, 'DB_POOL_RECYCLE', 1800),
+        'pool_pre_ping': _env_bool(environ, 'DB_POOL_PRE_PING', True),
+    }
+
+    statement_timeout = _env_int(environ, 'DB_STATEMENT_TIMEOUT_MS', 30000)
+    if backend == 'postgresql' and statement_timeout:
+        engine_options['connect_args'] = {'options': f'-c statement_timeout={statement_timeout}'}
+
+    config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options
+    return config
+
+
+def configure_engine(app, db):
+    """Apply per-connection settings to the app's engine; call after db.init_app"""
+    with app.app_context():
+        engine = db.engine
+
+    if engine.dialect.name != 'sqlite':
+        return
+
+    pragmas = app.config.get('SQLITE_PRAGMAS') or {}
+
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
@@ -3,6 +3,7 @@ import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
+import importlib
 from flask import Flask, send_from_directory
 from flask_cors import CORS
 
@@ -15,111 +16,159 @@ from src.models.product import Product
 from src.models.inventory import Inventory
 from src.models.stock_transaction import StockTransaction
 from src.models.daily_count import DailyCount
+from src.models.location_stock_summary import LocationStockSummary
+from src.models.daily_stock_movement import DailyStockMovement
+from src.models.inventory_snapshot import InventorySnapshot, InventorySnapshotLine
+from src.models.report_job import ReportJob
 
-# Import all routes
-from src.routes.user import user_bp
-from src.routes.auth import auth_bp
-from src.routes.location import location_bp
-from src.routes.supplier import supplier_bp
-from src.routes.brand import brand_bp
-from src.routes.product import product_bp
-from src.routes.inventory import inventory_bp
-from src.routes.stock_transaction import stock_transaction_bp
-from src.routes.daily_count import daily_count_bp
-from src.routes.reports import reports_bp
-from src.routes.dashboard import dashboard_bp
-from routes.health import health_bp
-
-app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
-app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
-
-# Enable CORS for all routes
-CORS(app)
-
-# Register all blueprints
-app.register_blueprint(auth_bp, url_prefix='/api')
-app.register_blueprint(user_bp, url_prefix='/api')
-app.register_blueprint(location_bp, url_prefix='/api')
-app.register_blueprint(supplier_bp, url_prefix='/api')
-app.register_blueprint(brand_bp, url_prefix='/api')
-app.register_blueprint(product_bp, url_prefix='/api')
-app.register_blueprint(inventory_bp, url_prefix='/api')
-app.register_blueprint(stock_transaction_bp, url_prefix='/api')
-app.register_blueprint(daily_count_bp, url_prefix='/api')
-app.register_blueprint(reports_bp, url_prefix='/api')
-app.register_blueprint(dashboard_bp, url_prefix='/api')
-app.register_blueprint(health_bp, url_prefix='/api')
-
-# Database configuration
-# For development, use SQLite
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
-# For production with PostgreSQL, uncomment the line below and set environment variables
-# app.config['SQLALCHEMY_DATABASE_URI'] = f"postgresql://{os.getenv('DB_USER', 'postgres')}:{os.getenv('DB_PASSWORD', 'password')}@{os.getenv('DB_HOST', 'localhost')}:{os.getenv('DB_PORT', '5432')}/{os.getenv('DB_NAME', 'stock_management')}"
-
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
-
-# Create tables and seed initial data
-with app.app_context():
-    db.create_all()
-    
-    # Seed initial data if tables are empty
-    if Location.query.count() == 0:
-        # Create default locations
-        central_warehouse = Location(
-            name='Central Warehouse',
-            location_type='warehouse',
-            address='123 Main St, City',
-            is_active=True
-        )
-        store_a = Location(
-            name='Store A',
-            location_type='store',
-            address='456 Store St, City',
-            is_active=True
-        )
-        store_b = Location(
-            name='Store B',
-            location_type='store',
-            address='789 Shop Ave, City',
-            is_active=True
-        )
-        
-        db.session.add_all([central_warehouse, store_a, store_b])
-        db.session.commit()
-        
-        # Create default admin user
-        from src.models.user import User
-        admin_user = User(
-            username='admin',
-            email='admin@example.com',
-            full_name='System Administrator',
-            role='admin',
-            is_active=True
-        )
-        admin_user.set_password('admin123')
-        
-        db.session.add(admin_user)
-        db.session.commit()
-        
-        print("Initial data seeded successfully!")
-
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
-def serve(path):
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
-            return "Static folder not configured", 404
-
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
+from src.cli import init_database, register_commands
+from src.config import configure_engine, database_config
+from src.services.compression import init_compression
+from src.services.json_provider import FastJSONProvider
+from src.services.metrics import init_metrics
+from src.services.slow_queries import init_slow_query_log
+
+# Tokens signed with a key from the source or the examples can be forged,
+# so these are refused outside testing; debug mode is no exception, as the
+# container runs the development entry point
+DEV_SECRET_KEY = 'dev-only-insecure-secret-key'
+INSECURE_SECRET_KEYS = {
+    DEV_SECRET_KEY,
+    'asdf#FGSgvasgf$5$WGT',
+    'your-super-secret-key-change-in-production',
+}
+
+# Blueprints are imported when an app is built, not when this module loads
+BLUEPRINTS = (
+    ('src.routes.auth', 'auth_bp'),
+    ('src.routes.user', 'user_bp'),
+    ('src.routes.location', 'location_bp'),
+    ('src.routes.supplier', 'supplier_bp'),
+    ('src.routes.brand', 'brand_bp'),
+    ('src.routes.product', 'product_bp'),
+    ('src.routes.inventory', 'inventory_bp'),
+    ('src.routes.stock_transaction', 'stock_transaction_bp'),
+    ('src.routes.daily_count', 'daily_count_bp'),
+    ('src.routes.reports', 'reports_bp'),
+    ('src.routes.dashboard', 'dashboard_bp'),
+    ('src.routes.health', 'health_bp'),
+    ('src.routes.metrics', 'metrics_bp'),
+)
+
+
+def create_app(config=None):
+    """Build a configured app; config overrides the environment defaults.
+
+    No DDL or queries run here, so every worker starts without touching
+    the database. Create the schema and seed data once per deploy with
+    `flask --app src.main init-db`.
+    """
+    app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+    # Signs every auth token; see the check after config overrides below
+    app.config['SECRET_KEY'] = os.getenv('SECRET_KEY')
+
+    # Database URI and engine tuning come from the environment (see src/config.py)
+    app.config.update(database_config((config or {}).get('SQLALCHEMY_DATABASE_URI')))
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    # Dashboard result cache; shared across workers when Redis is reachable.
+    # Without Redis each worker caches alone and may serve figures up to
+    # DASHBOARD_CACHE_TTL seconds older than another worker's writes (0 = off)
+    app.config['REDIS_URL'] = os.getenv('REDIS_URL')
+    app.config['DASHBOARD_CACHE_TTL'] = int(os.getenv('DASHBOARD_CACHE_TTL', 60))
+
+    # Auth tokens are verified without a database lookup; revocations reach
+    # other workers within AUTH_REVOCATION_TTL seconds
+    app.config['AUTH_TOKEN_MAX_AGE'] = int(os.getenv('AUTH_TOKEN_MAX_AGE', 12 * 60 * 60))
+    app.config['AUTH_REVOCATION_TTL'] = int(os.getenv('AUTH_REVOCATION_TTL', 30))
+    app.config['BCRYPT_LOG_ROUNDS'] = int(os.getenv('BCRYPT_LOG_ROUNDS', 12))
+
+    # Responses of COMPRESS_MIN_SIZE bytes or more are gzip/deflate encoded
+    app.config['COMPRESS_MIN_SIZE'] = int(os.getenv('COMPRESS_MIN_SIZE', 1024))
+    app.config['COMPRESS_LEVEL'] = int(os.getenv('COMPRESS_LEVEL', 6))
+
+    # Statements slower than SLOW_QUERY_MS are logged with their plan (0 = off)
+    app.config['SLOW_QUERY_MS'] = int(os.getenv('SLOW_QUERY_MS', 0))
+    app.config['SLOW_QUERY_LOG'] = os.getenv('SLOW_QUERY_LOG', 'logs/slow_queries.log')
+    app.config['SLOW_QUERY_LOG_MAX_BYTES'] = int(os.getenv('SLOW_QUERY_LOG_MAX_BYTES', 10 * 1024 * 1024))
+    app.config['SLOW_QUERY_LOG_BACKUPS'] = int(os.getenv('SLOW_QUERY_LOG_BACKUPS', 5))
+    app.config['SLOW_QUERY_RATE_LIMIT'] = int(os.getenv('SLOW_QUERY_RATE_LIMIT', 30))
+    app.config['SLOW_QUERY_EXPLAIN'] = os.getenv('SLOW_QUERY_EXPLAIN', 'true').lower() in ('1', 'true', 'yes', 'on')
+
+    # /health reads figures sampled in the background every HEALTH_SAMPLE_INTERVAL seconds
+    app.config['HEALTH_SAMPLE_INTERVAL'] = int(os.getenv('HEALTH_SAMPLE_INTERVAL', 5))
+    app.config['HEALTH_DB_TIMEOUT_MS'] = int(os.getenv('HEALTH_DB_TIMEOUT_MS', 2000))
+
+    # Background report jobs: concurrency, queue bound, and how long a result is reused
+    app.config['REPORT_JOB_WORKERS'] = int(os.getenv('REPORT_JOB_WORKERS', 2))
+    app.config['REPORT_JOB_MAX_PENDING'] = int(os.getenv('REPORT_JOB_MAX_PENDING', 20))
+    app.config['REPORT_JOB_REUSE_SECONDS'] = int(os.getenv('REPORT_JOB_REUSE_SECONDS', 300))
+    app.config['REPORT_JOB_TIMEOUT'] = int(os.getenv('REPORT_JOB_TIMEOUT', 3600))
+
+    # Usage forecasting behind purchase suggestions and usage analysis
+    app.config['FORECAST_HISTORY_DAYS'] = int(os.getenv('FORECAST_HISTORY_DAYS', 56))
+    app.config['FORECAST_ALPHA'] = float(os.getenv('FORECAST_ALPHA', 0.3))
+    app.config['FORECAST_SERVICE_LEVEL'] = float(os.getenv('FORECAST_SERVICE_LEVEL', 0.95))
+    app.config['FORECAST_LEAD_TIME_DAYS'] = int(os.getenv('FORECAST_LEAD_TIME_DAYS', 7))
+
+    if config:
+        app.config.update(config)
+
+    if not app.config.get('SECRET_KEY') or app.config['SECRET_KEY'] in INSECURE_SECRET_KEYS:
+        if not app.testing:
+            raise RuntimeError('Set SECRET_KEY to a long random value; it signs every auth token')
+        app.config['SECRET_KEY'] = app.config.get('SECRET_KEY') or DEV_SECRET_KEY
+
+    # orjson encodes responses when installed
+    app.json = FastJSONProvider(app)
+
+    # Enable CORS for all routes
+    CORS(app)
+
+    db.init_app(app)
+    configure_engine(app, db)
+
+    # Per-endpoint latency and SQL metrics, served at /api/metrics; set up
+    # before compression so sizes are measured as sent
+    init_metrics(app, db)
+    init_slow_query_log(app, db)  # no-op unless SLOW_QUERY_MS is set
+
+    # Compress large responses for stores on slow links
+    init_compression(app)
+
+    register_commands(app)
+
+    # Register all blueprints
+    for module_name, blueprint_name in BLUEPRINTS:
+        module = importlib.import_module(module_name)
+        app.register_blueprint(getattr(module, blueprint_name), url_prefix='/api')
+
+    register_frontend(app)
+    return app
+
+
+def register_frontend(app):
+    """Serve the built frontend for every non-API path"""
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def serve(path):
+        static_folder_path = app.static_folder
+        if static_folder_path is None:
+                return "Static folder not configured", 404
+
+        if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
+            return send_from_directory(static_folder_path, path)
         else:
-            return "index.html not found", 404
+            index_path = os.path.join(static_folder_path, 'index.html')
+            if os.path.exists(index_path):
+                return send_from_directory(static_folder_path, 'index.html')
+            else:
+                return "index.html not found", 404
 
 
 if __name__ == '__main__':
+    app = create_app({'DEBUG': True})
+    # The development server is a single process, so it can prepare the database itself
+    with app.app_context():
+        init_database()
     app.run(host='0.0.0.0', port=5000, debug=True)
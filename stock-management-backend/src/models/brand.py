@@ -1,5 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
 from src.models.user import db
+from src.services.serialization import shape_dict
 
 class Brand(db.Model):
     __tablename__ = 'brands'
@@ -14,8 +15,8 @@ class Brand(db.Model):
     def __repr__(self):
         return f'<Brand {self.name}>'
 
-    def to_dict(self):
-        return {
+    def to_dict(self, fields=None, expand=None):
+        data = {
             'id': self.id,
             'name': self.name,
             'description': self.description,
@@ -23,4 +24,5 @@ class Brand(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
+        return shape_dict(self, data, fields, expand)
 
@@ -1,5 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
 from src.models.user import db
+from src.services.serialization import shape_dict
 
 class DailyCount(db.Model):
     __tablename__ = 'daily_counts'
@@ -18,17 +19,24 @@ class DailyCount(db.Model):
     product = db.relationship('Product', backref='daily_counts')
     location = db.relationship('Location', backref='daily_counts')
     user = db.relationship('User', backref='daily_counts')
+
+    # Relationships nested by to_dict(), used to plan eager loads
+    serialize_relations = ('product', 'location', 'user')
     
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
 
     # Unique constraint to ensure one count per product per location per day
-    __table_args__ = (db.UniqueConstraint('product_id', 'location_id', 'count_date', name='unique_daily_count'),)
+    # and an index for keyset pagination ordered by (count_date, id)
+    __table_args__ = (
+        db.UniqueConstraint('product_id', 'location_id', 'count_date', name='unique_daily_count'),
+        db.Index('ix_daily_counts_count_date_id', 'count_date', 'id'),
+    )
 
     def __repr__(self):
         return f'<DailyCount {self.count_date} Product:{self.product_id} Location:{self.location_id} Count:{self.counted_quantity}>'
 
-    def to_dict(self):
-        return {
+    def to_dict(self, fields=None, expand=None):
+        data = {
             'id': self.id,
             'count_date': self.count_date.isoformat() if self.count_date else None,
             'counted_quantity': self.counted_quantity,
@@ -36,9 +44,7 @@ class DailyCount(db.Model):
             'product_id': self.product_id,
             'location_id': self.location_id,
             'user_id': self.user_id,
-            'product': self.product.to_dict() if self.product else None,
-            'location': self.location.to_dict() if self.location else None,
-            'user': self.user.to_dict() if self.user else None,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
+        return shape_dict(self, data, fields, expand)
 
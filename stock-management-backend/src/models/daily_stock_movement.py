@@ -0,0 +1,35 @@
+from flask_sqlalchemy import SQLAlchemy
+from src.models.user import db
+from src.services.serialization import shape_dict
+
+class DailyStockMovement(db.Model):
+    """Ledger totals per day, product, location and transaction type"""
+    __tablename__ = 'daily_stock_movement'
+    
+    movement_date = db.Column(db.Date, primary_key=True)
+    location_id = db.Column(db.Integer, db.ForeignKey('locations.id'), primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), primary_key=True)
+    transaction_type = db.Column(db.String(20), primary_key=True)        # As StockTransaction.transaction_type
+    total_quantity = db.Column(db.Integer, nullable=False, default=0)     # Signed, as booked in the ledger
+    transaction_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    # Relationships
+    product = db.relationship('Product')
+    location = db.relationship('Location')
+
+    # Per-product history across locations
+    __table_args__ = (db.Index('ix_daily_stock_movement_product_date', 'product_id', 'movement_date'),)
+
+    def __repr__(self):
+        return f'<DailyStockMovement {self.movement_date} Product:{self.product_id} Location:{self.location_id} {self.transaction_type}>'
+
+    def to_dict(self, fields=None, expand=None):
+        data = {
+            'movement_date': self.movement_date.isoformat() if self.movement_date else None,
+            'location_id': self.location_id,
+            'product_id': self.product_id,
+            'transaction_type': self.transaction_type,
+            'total_quantity': self.total_quantity,
+            'transaction_count': self.transaction_count
+        }
+        return shape_dict(self, data, fields, expand)
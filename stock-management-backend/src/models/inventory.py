@@ -1,5 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
 from src.models.user import db
+from src.services.serialization import shape_dict
 
 class Inventory(db.Model):
     __tablename__ = 'inventory'
@@ -14,6 +15,9 @@ class Inventory(db.Model):
     # Relationships
     product = db.relationship('Product', backref='inventory_records')
     location = db.relationship('Location', backref='inventory_records')
+
+    # Relationships nested by to_dict(), used to plan eager loads
+    serialize_relations = ('product', 'location')
     
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
     updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
@@ -24,15 +28,14 @@ class Inventory(db.Model):
     def __repr__(self):
         return f'<Inventory Product:{self.product_id} Location:{self.location_id} Qty:{self.quantity}>'
 
-    def to_dict(self):
-        return {
+    def to_dict(self, fields=None, expand=None):
+        data = {
             'id': self.id,
             'quantity': self.quantity,
             'product_id': self.product_id,
             'location_id': self.location_id,
-            'product': self.product.to_dict() if self.product else None,
-            'location': self.location.to_dict() if self.location else None,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
+        return shape_dict(self, data, fields, expand)
 
@@ -0,0 +1,47 @@
+from flask_sqlalchemy import SQLAlchemy
+from src.models.user import db
+from src.services.serialization import shape_dict
+
+class InventorySnapshot(db.Model):
+    """Stock on hand at the end of a day, for every location"""
+    __tablename__ = 'inventory_snapshots'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    snapshot_date = db.Column(db.Date, nullable=False, unique=True)
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    
+    # Relationships
+    lines = db.relationship('InventorySnapshotLine', backref='snapshot', cascade='all, delete-orphan')
+
+    def __repr__(self):
+        return f'<InventorySnapshot {self.snapshot_date}>'
+
+    def to_dict(self, fields=None, expand=None):
+        data = {
+            'id': self.id,
+            'snapshot_date': self.snapshot_date.isoformat() if self.snapshot_date else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+        return shape_dict(self, data, fields, expand)
+
+
+class InventorySnapshotLine(db.Model):
+    """One non-zero stock figure of a snapshot; missing lines mean zero"""
+    __tablename__ = 'inventory_snapshot_lines'
+    
+    snapshot_id = db.Column(db.Integer, db.ForeignKey('inventory_snapshots.id', ondelete='CASCADE'), primary_key=True)
+    location_id = db.Column(db.Integer, db.ForeignKey('locations.id'), primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), primary_key=True)
+    quantity = db.Column(db.Integer, nullable=False)
+
+    def __repr__(self):
+        return f'<InventorySnapshotLine Location:{self.location_id} Product:{self.product_id} Qty:{self.quantity}>'
+
+    def to_dict(self, fields=None, expand=None):
+        data = {
+            'snapshot_id': self.snapshot_id,
+            'location_id': self.location_id,
+            'product_id': self.product_id,
+            'quantity': self.quantity
+        }
+        return shape_dict(self, data, fields, expand)
@@ -1,5 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
 from src.models.user import db
+from src.services.serialization import shape_dict
 
 class Location(db.Model):
     __tablename__ = 'locations'
@@ -15,8 +16,8 @@ class Location(db.Model):
     def __repr__(self):
         return f'<Location {self.name}>'
 
-    def to_dict(self):
-        return {
+    def to_dict(self, fields=None, expand=None):
+        data = {
             'id': self.id,
             'name': self.name,
             'location_type': self.location_type,
@@ -25,4 +26,5 @@ class Location(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
+        return shape_dict(self, data, fields, expand)
 
@@ -0,0 +1,30 @@
+from flask_sqlalchemy import SQLAlchemy
+from src.models.user import db
+from src.services.serialization import shape_dict
+
+class LocationStockSummary(db.Model):
+    """Per-location inventory totals, kept current by every stock mutation"""
+    __tablename__ = 'location_stock_summary'
+    
+    location_id = db.Column(db.Integer, db.ForeignKey('locations.id'), primary_key=True)
+    total_products = db.Column(db.Integer, nullable=False, default=0)   # Inventory rows at the location
+    total_quantity = db.Column(db.Integer, nullable=False, default=0)
+    low_stock_count = db.Column(db.Integer, nullable=False, default=0)  # Rows at or below reorder point
+    
+    # Relationships
+    location = db.relationship('Location', backref=db.backref('stock_summary', uselist=False))
+    
+    updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+
+    def __repr__(self):
+        return f'<LocationStockSummary Location:{self.location_id} Qty:{self.total_quantity}>'
+
+    def to_dict(self, fields=None, expand=None):
+        data = {
+            'location_id': self.location_id,
+            'total_products': self.total_products,
+            'total_quantity': self.total_quantity,
+            'low_stock_count': self.low_stock_count,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+        return shape_dict(self, data, fields, expand)
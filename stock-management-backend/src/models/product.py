@@ -1,5 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
 from src.models.user import db
+from src.services.serialization import shape_dict
 
 class Product(db.Model):
     __tablename__ = 'products'
@@ -21,6 +22,9 @@ class Product(db.Model):
     # Relationships
     brand = db.relationship('Brand', backref='products')
     supplier = db.relationship('Supplier', backref='products')
+
+    # Relationships nested by to_dict(), used to plan eager loads
+    serialize_relations = ('brand', 'supplier')
     
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
     updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
@@ -28,8 +32,8 @@ class Product(db.Model):
     def __repr__(self):
         return f'<Product {self.sku}: {self.name}>'
 
-    def to_dict(self):
-        return {
+    def to_dict(self, fields=None, expand=None):
+        data = {
             'id': self.id,
             'sku': self.sku,
             'name': self.name,
@@ -41,9 +45,8 @@ class Product(db.Model):
             'is_active': self.is_active,
             'brand_id': self.brand_id,
             'supplier_id': self.supplier_id,
-            'brand': self.brand.to_dict() if self.brand else None,
-            'supplier': self.supplier.to_dict() if self.supplier else None,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
+        return shape_dict(self, data, fields, expand)
 
@@ -0,0 +1,51 @@
+import json
+from flask_sqlalchemy import SQLAlchemy
+from src.models.user import db
+from src.services.serialization import shape_dict
+
+class ReportJob(db.Model):
+    """A report computed in the background; identical requests share one job"""
+    __tablename__ = 'report_jobs'
+    
+    id = db.Column(db.String(32), primary_key=True)
+    report_type = db.Column(db.String(50), nullable=False)
+    params = db.Column(db.Text, nullable=False)          # Canonical JSON of the validated parameters
+    params_hash = db.Column(db.String(64), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # 'queued', 'running', 'succeeded', 'failed'
+    result = db.Column(db.Text)                          # JSON, once succeeded
+    error = db.Column(db.Text)
+    
+    # Foreign Keys
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        # Lookup of a reusable job for the same report and parameters
+        db.Index('ix_report_jobs_type_params', 'report_type', 'params_hash', 'created_at'),
+        # At most one queued or running job per report and parameters
+        db.Index(
+            'uq_report_jobs_active', 'report_type', 'params_hash', unique=True,
+            sqlite_where=db.text("status IN ('queued', 'running')"),
+            postgresql_where=db.text("status IN ('queued', 'running')")
+        ),
+    )
+
+    def __repr__(self):
+        return f'<ReportJob {self.id} {self.report_type} {self.status}>'
+
+    def to_dict(self, fields=None, expand=None):
+        data = {
+            'id': self.id,
+            'report_type': self.report_type,
+            'params': json.loads(self.params) if self.params else None,
+            'status': self.status,
+            'error': self.error,
+            'user_id': self.user_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+        return shape_dict(self, data, fields, expand)
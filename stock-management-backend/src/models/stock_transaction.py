@@ -1,11 +1,12 @@
 from flask_sqlalchemy import SQLAlchemy
 from src.models.user import db
+from src.services.serialization import shape_dict
 
 class StockTransaction(db.Model):
     __tablename__ = 'stock_transactions'
     
     id = db.Column(db.Integer, primary_key=True)
-    transaction_type = db.Column(db.String(20), nullable=False)  # 'stock_in', 'transfer', 'adjustment', 'daily_usage'
+    transaction_type = db.Column(db.String(20), nullable=False)  # 'stock_in', 'transfer', 'adjustment', 'daily_usage', 'count_adjustment'
     quantity = db.Column(db.Integer, nullable=False)
     notes = db.Column(db.Text)
     
@@ -20,14 +21,30 @@ class StockTransaction(db.Model):
     from_location = db.relationship('Location', foreign_keys=[from_location_id], backref='outgoing_transactions')
     to_location = db.relationship('Location', foreign_keys=[to_location_id], backref='incoming_transactions')
     user = db.relationship('User', backref='transactions')
+
+    # Relationships nested by to_dict(), used to plan eager loads
+    serialize_relations = ('product', 'from_location', 'to_location', 'user')
     
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
 
+    # Supports keyset pagination ordered by (created_at, id)
+    __table_args__ = (db.Index('ix_stock_transactions_created_at_id', 'created_at', 'id'),)
+
     def __repr__(self):
         return f'<StockTransaction {self.transaction_type} Product:{self.product_id} Qty:{self.quantity}>'
 
-    def to_dict(self):
-        return {
+    @classmethod
+    def involving_location(cls, location_id):
+        """Filter clause matching transactions into or out of a location"""
+        return db.or_(cls.from_location_id == location_id, cls.to_location_id == location_id)
+
+    @classmethod
+    def effective_location_id(cls):
+        """SQL expression for the one location a ledger row moved stock at"""
+        return db.case((cls.quantity < 0, cls.from_location_id), else_=cls.to_location_id)
+
+    def to_dict(self, fields=None, expand=None):
+        data = {
             'id': self.id,
             'transaction_type': self.transaction_type,
             'quantity': self.quantity,
@@ -36,10 +53,7 @@ class StockTransaction(db.Model):
             'from_location_id': self.from_location_id,
             'to_location_id': self.to_location_id,
             'user_id': self.user_id,
-            'product': self.product.to_dict() if self.product else None,
-            'from_location': self.from_location.to_dict() if self.from_location else None,
-            'to_location': self.to_location.to_dict() if self.to_location else None,
-            'user': self.user.to_dict() if self.user else None,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
+        return shape_dict(self, data, fields, expand)
 
@@ -1,5 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
 from src.models.user import db
+from src.services.serialization import shape_dict
 
 class Supplier(db.Model):
     __tablename__ = 'suppliers'
@@ -17,8 +18,8 @@ class Supplier(db.Model):
     def __repr__(self):
         return f'<Supplier {self.name}>'
 
-    def to_dict(self):
-        return {
+    def to_dict(self, fields=None, expand=None):
+        data = {
             'id': self.id,
             'name': self.name,
             'contact_person': self.contact_person,
@@ -29,4 +30,5 @@ class Supplier(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
+        return shape_dict(self, data, fields, expand)
 
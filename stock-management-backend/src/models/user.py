@@ -1,8 +1,19 @@
 from flask_sqlalchemy import SQLAlchemy
+from flask import current_app, has_app_context
 import bcrypt
+from src.services.serialization import shape_dict
 
 db = SQLAlchemy()
 
+DEFAULT_BCRYPT_ROUNDS = 12
+
+
+def bcrypt_rounds():
+    """bcrypt cost factor from BCRYPT_LOG_ROUNDS"""
+    if has_app_context():
+        return int(current_app.config.get('BCRYPT_LOG_ROUNDS', DEFAULT_BCRYPT_ROUNDS))
+    return DEFAULT_BCRYPT_ROUNDS
+
 class User(db.Model):
     __tablename__ = 'users'
     
@@ -13,12 +24,16 @@ class User(db.Model):
     full_name = db.Column(db.String(100), nullable=False)
     role = db.Column(db.String(20), nullable=False, default='staff')  # 'admin', 'manager', 'staff'
     is_active = db.Column(db.Boolean, default=True)
+    token_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Bumped to revoke issued tokens
     
     # Foreign Key for location access (null means access to all locations)
     location_id = db.Column(db.Integer, db.ForeignKey('locations.id'), nullable=True)
     
     # Relationship
     location = db.relationship('Location', backref='users')
+
+    # Relationships nested by to_dict(), used to plan eager loads
+    serialize_relations = ('location',)
     
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
     updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
@@ -28,14 +43,20 @@ class User(db.Model):
 
     def set_password(self, password):
         """Hash and set password"""
-        self.password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        self.password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=bcrypt_rounds())).decode('utf-8')
 
     def check_password(self, password):
         """Check if provided password matches hash"""
         return bcrypt.checkpw(password.encode('utf-8'), self.password_hash.encode('utf-8'))
 
-    def to_dict(self):
-        return {
+    def password_needs_rehash(self):
+        """Whether the stored hash was made with a different cost than configured"""
+        # bcrypt hashes look like $2b$<cost>$<salt+hash>
+        parts = self.password_hash.split('$')
+        return len(parts) < 4 or not parts[2].isdigit() or int(parts[2]) != bcrypt_rounds()
+
+    def to_dict(self, fields=None, expand=None):
+        data = {
             'id': self.id,
             'username': self.username,
             'email': self.email,
@@ -43,7 +64,7 @@ class User(db.Model):
             'role': self.role,
             'is_active': self.is_active,
             'location_id': self.location_id,
-            'location': self.location.to_dict() if self.location else None,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
+        return shape_dict(self, data, fields, expand)
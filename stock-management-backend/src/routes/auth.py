@@ -1,14 +1,37 @@
-from flask import Blueprint, jsonify, request, session
+from flask import Blueprint, g, jsonify, request, session
 from src.models.user import User, db
+from src.services.auth_tokens import issue_token, token_versions, verify_token
 from functools import wraps
 
 auth_bp = Blueprint('auth', __name__)
 
+def current_claims():
+    """Verified token claims for this request, or None
+
+    The token comes from an Authorization: Bearer header, or from the
+    session cookie set at login. Checking it costs an HMAC and a dict
+    lookup; the database is not consulted.
+    """
+    if 'auth_claims' not in g:
+        token = None
+        header = request.headers.get('Authorization', '')
+        if header.startswith('Bearer '):
+            token = header[len('Bearer '):]
+        elif 'auth_token' in session:
+            token = session['auth_token']
+        g.auth_claims = verify_token(token) if token else None
+    return g.auth_claims
+
+def current_user_id():
+    """Id of the logged-in user, or None"""
+    claims = current_claims()
+    return claims['uid'] if claims else None
+
 def login_required(f):
     """Decorator to require login for protected routes"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
+        if not current_claims():
             return jsonify({'error': 'Authentication required'}), 401
         return f(*args, **kwargs)
     return decorated_function
@@ -17,11 +40,11 @@ def admin_required(f):
     """Decorator to require admin role"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
+        claims = current_claims()
+        if not claims:
             return jsonify({'error': 'Authentication required'}), 401
         
-        user = User.query.get(session['user_id'])
-        if not user or user.role != 'admin':
+        if claims['role'] != 'admin':
             return jsonify({'error': 'Admin access required'}), 403
         return f(*args, **kwargs)
     return decorated_function
@@ -37,12 +60,17 @@ def login():
         user = User.query.filter_by(username=data['username']).first()
         
         if user and user.check_password(data['password']) and user.is_active:
-            session['user_id'] = user.id
-            session['user_role'] = user.role
-            session['location_id'] = user.location_id
+            if user.password_needs_rehash():
+                # Move the stored hash to the configured BCRYPT_LOG_ROUNDS
+                user.set_password(data['password'])
+                db.session.commit()
+            
+            token = issue_token(user)
+            session['auth_token'] = token
             
             return jsonify({
                 'message': 'Login successful',
+                'token': token,
                 'user': user.to_dict()
             }), 200
         else:
@@ -54,7 +82,13 @@ def login():
 @auth_bp.route('/logout', methods=['POST'])
 @login_required
 def logout():
-    """User logout endpoint"""
+    """User logout endpoint; all_devices revokes every token issued to the user"""
+    data = request.get_json(silent=True) or {}
+    if data.get('all_devices'):
+        user = User.query.get(current_user_id())
+        if user:
+            token_versions.revoke(user)
+            db.session.commit()
     session.clear()
     return jsonify({'message': 'Logout successful'}), 200
 
@@ -62,14 +96,10 @@ def logout():
 @login_required
 def get_current_user():
     """Get current user information"""
-    try:
-        user = User.query.get(session['user_id'])
-        if user:
-            return jsonify(user.to_dict()), 200
-        else:
-            return jsonify({'error': 'User not found'}), 404
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    user = User.query.get(current_user_id())
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+    return jsonify(user.to_dict()), 200
 
 @auth_bp.route('/change-password', methods=['POST'])
 @login_required
@@ -80,17 +110,22 @@ def change_password():
         if not data or not data.get('current_password') or not data.get('new_password'):
             return jsonify({'error': 'Current password and new password required'}), 400
         
-        user = User.query.get(session['user_id'])
+        user = User.query.get(current_user_id())
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
         if not user.check_password(data['current_password']):
             return jsonify({'error': 'Current password is incorrect'}), 400
         
+        # Tokens issued before the change stop working; this client gets a new one
         user.set_password(data['new_password'])
+        token_versions.revoke(user)
         db.session.commit()
         
-        return jsonify({'message': 'Password changed successfully'}), 200
+        token = issue_token(user)
+        session['auth_token'] = token
+        
+        return jsonify({'message': 'Password changed successfully', 'token': token}), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
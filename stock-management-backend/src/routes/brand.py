@@ -1,9 +1,11 @@
 from flask import Blueprint, jsonify, request
 from src.models.brand import Brand, db
+from src.services.conditional import conditional_on
 
 brand_bp = Blueprint('brand', __name__)
 
 @brand_bp.route('/brands', methods=['GET'])
+@conditional_on(Brand)
 def get_brands():
     brands = Brand.query.all()
     return jsonify([brand.to_dict() for brand in brands])
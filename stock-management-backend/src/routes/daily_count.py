@@ -1,8 +1,12 @@
 from flask import Blueprint, jsonify, request
 from src.models.daily_count import DailyCount, db
-from src.models.inventory import Inventory
-from src.models.stock_transaction import StockTransaction
-from datetime import datetime, date
+from src.models.product import Product
+from src.services.serialization import eager_load_options, serialization_args
+from src.services.pagination import keyset_paginate
+from src.services.daily_counts import counted_usage, record_daily_counts, MAX_BATCH_LINES
+from src.services.inventory import InventoryError
+from src.routes.auth import current_user_id
+from datetime import datetime
 
 daily_count_bp = Blueprint('daily_count', __name__)
 
@@ -11,96 +15,75 @@ def record_daily_count():
     """Record daily physical count and calculate usage"""
     data = request.json
     
-    product_id = data['product_id']
-    location_id = data['location_id']
-    counted_quantity = data['counted_quantity']
-    count_date = datetime.fromisoformat(data.get('count_date', datetime.now().isoformat())).date()
-    
-    # Get current inventory
-    inventory = Inventory.query.filter_by(
-        product_id=product_id,
-        location_id=location_id
-    ).first()
-    
-    if not inventory:
-        return jsonify({'error': 'Product not found in this location'}), 404
-    
-    # Check if count already exists for this date
-    existing_count = DailyCount.query.filter_by(
-        product_id=product_id,
-        location_id=location_id,
-        count_date=count_date
-    ).first()
-    
-    if existing_count:
-        # Update existing count
-        old_usage = existing_count.calculated_usage
-        existing_count.counted_quantity = counted_quantity
-        existing_count.calculated_usage = inventory.quantity - counted_quantity
-        
-        # Update inventory
-        inventory.quantity = counted_quantity
-        
-        # Create adjustment transaction for the difference
-        usage_diff = existing_count.calculated_usage - old_usage
-        if usage_diff != 0:
-            transaction = StockTransaction(
-                product_id=product_id,
-                location_id=location_id,
-                transaction_type='daily_usage_adjustment',
-                quantity=-usage_diff,
-                reference_id=existing_count.id,
-                notes=f'Daily count adjustment for {count_date}'
-            )
-            db.session.add(transaction)
-        
-        db.session.commit()
-        return jsonify(existing_count.to_dict())
+    user_id = data.get('user_id') or current_user_id()
+    if not user_id:
+        return jsonify({'error': 'user_id is required'}), 400
     
-    else:
-        # Calculate usage (starting inventory - counted quantity)
-        calculated_usage = inventory.quantity - counted_quantity
-        
-        # Create new daily count record
-        daily_count = DailyCount(
-            product_id=product_id,
-            location_id=location_id,
-            count_date=count_date,
-            starting_quantity=inventory.quantity,
-            counted_quantity=counted_quantity,
-            calculated_usage=calculated_usage
-        )
-        db.session.add(daily_count)
-        
-        # Update inventory to counted quantity
-        inventory.quantity = counted_quantity
-        
-        # Create transaction record for usage
-        if calculated_usage > 0:
-            transaction = StockTransaction(
-                product_id=product_id,
-                location_id=location_id,
-                transaction_type='daily_usage',
-                quantity=-calculated_usage,
-                reference_id=daily_count.id,
-                notes=f'Daily usage for {count_date}'
-            )
-            db.session.add(transaction)
-        
-        db.session.commit()
-        return jsonify(daily_count.to_dict()), 201
+    try:
+        result = record_daily_counts([data], user_id)[0]
+    except InventoryError as e:
+        return jsonify({'error': str(e)}), 409
+    
+    if result['status'] == 'error':
+        status_code = 404 if result['error'] == 'Product not found in this location' else 400
+        return jsonify({'error': result['error']}), status_code
+    
+    return jsonify(result['daily_count']), 201 if result['status'] == 'created' else 200
+
+@daily_count_bp.route('/daily-count/bulk', methods=['POST'])
+def record_daily_counts_bulk():
+    """Record a whole store's closing counts in one request
+    
+    Body: {"count_date": optional ISO date, "counts": [{"product_id",
+    "location_id", "counted_quantity", optional "count_date"}, ...]}.
+    Returns one result per line; failed lines do not abort the batch.
+    """
+    data = request.json or {}
+    lines = data.get('counts')
+    
+    if not isinstance(lines, list) or not lines:
+        return jsonify({'error': 'counts must be a non-empty list'}), 400
+    
+    if len(lines) > MAX_BATCH_LINES:
+        return jsonify({'error': f'At most {MAX_BATCH_LINES} counts per request'}), 400
+    
+    user_id = data.get('user_id') or current_user_id()
+    if not user_id:
+        return jsonify({'error': 'user_id is required'}), 400
+    
+    try:
+        default_date = datetime.fromisoformat(data['count_date']).date() if data.get('count_date') else None
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid count_date'}), 400
+    
+    try:
+        results = record_daily_counts(lines, user_id, default_date)
+    except InventoryError as e:
+        return jsonify({'error': str(e)}), 409
+    
+    return jsonify({
+        'results': results,
+        'created': sum(1 for r in results if r['status'] == 'created'),
+        'updated': sum(1 for r in results if r['status'] == 'updated'),
+        'errors': sum(1 for r in results if r['status'] == 'error')
+    })
 
 @daily_count_bp.route('/daily-count', methods=['GET'])
 def get_daily_counts():
-    """Get daily count records"""
+    """Get daily count records
+
+    Pass ``cursor`` (empty for the first page) to page by (count_date, id)
+    instead of page numbers; ``include_total=true`` adds the total count.
+    """
     location_id = request.args.get('location_id', type=int)
     product_id = request.args.get('product_id', type=int)
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 50, type=int)
+    fields, expand = serialization_args(request.args)
     
-    query = DailyCount.query
+    query = DailyCount.query.options(*eager_load_options(DailyCount, fields, expand))
     
     if location_id:
         query = query.filter(DailyCount.location_id == location_id)
@@ -116,6 +99,25 @@ def get_daily_counts():
         end_dt = datetime.fromisoformat(end_date).date()
         query = query.filter(DailyCount.count_date <= end_dt)
     
+    cursor = request.args.get('cursor')
+    if cursor is not None:
+        try:
+            counts = keyset_paginate(
+                query,
+                [DailyCount.count_date, DailyCount.id],
+                cursor=cursor,
+                per_page=per_page,
+                with_total=request.args.get('include_total') == 'true'
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify({
+            'daily_counts': [c.to_dict(fields, expand) for c in counts.items],
+            'next_cursor': counts.next_cursor,
+            'total': counts.total
+        })
+    
     query = query.order_by(DailyCount.count_date.desc())
     
     counts = query.paginate(
@@ -123,7 +125,7 @@ def get_daily_counts():
     )
     
     return jsonify({
-        'daily_counts': [c.to_dict() for c in counts.items],
+        'daily_counts': [c.to_dict(fields, expand) for c in counts.items],
         'total': counts.total,
         'pages': counts.pages,
         'current_page': page
@@ -144,10 +146,11 @@ def get_usage_summary():
     
     query = db.session.query(
         DailyCount.product_id,
-        db.func.sum(DailyCount.calculated_usage).label('total_usage'),
-        db.func.avg(DailyCount.calculated_usage).label('avg_daily_usage'),
+        Product.name.label('product_name'),
+        db.func.sum(counted_usage()).label('total_usage'),
+        db.func.avg(counted_usage()).label('avg_daily_usage'),
         db.func.count(DailyCount.id).label('count_days')
-    ).filter(
+    ).outerjoin(Product, DailyCount.product_id == Product.id).filter(
         DailyCount.count_date >= start_dt,
         DailyCount.count_date <= end_dt
     )
@@ -155,15 +158,13 @@ def get_usage_summary():
     if location_id:
         query = query.filter(DailyCount.location_id == location_id)
     
-    results = query.group_by(DailyCount.product_id).all()
+    results = query.group_by(DailyCount.product_id, Product.name).all()
     
     summary = []
     for result in results:
-        from src.models.product import Product
-        product = Product.query.get(result.product_id)
         summary.append({
             'product_id': result.product_id,
-            'product_name': product.name if product else 'Unknown',
+            'product_name': result.product_name or 'Unknown',
             'total_usage': float(result.total_usage or 0),
             'avg_daily_usage': float(result.avg_daily_usage or 0),
             'count_days': result.count_days
@@ -1,7 +1,7 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, current_app, jsonify
 from datetime import datetime
-import psutil
-import os
+from src.models.user import db
+from src.services.health import DEFAULT_DB_TIMEOUT_MS, health_sampler, probe_database
 
 health_bp = Blueprint('health', __name__)
 
@@ -9,9 +9,11 @@ health_bp = Blueprint('health', __name__)
 def health_check():
     """
     Health check endpoint for monitoring and load balancers
-    Returns system status and basic metrics
+    Returns system status and basic metrics from the background sampler
     """
     try:
+        sample = health_sampler.latest(current_app._get_current_object(), db.engine)
+        
         # Basic system information
         health_data = {
             'status': 'healthy',
@@ -19,22 +21,22 @@ def health_check():
             'service': 'stock-management-backend',
             'version': '1.0.0',
             'uptime': get_uptime(),
-            'system': {
-                'cpu_percent': psutil.cpu_percent(interval=1),
-                'memory_percent': psutil.virtual_memory().percent,
-                'disk_percent': psutil.disk_usage('/').percent
-            }
+            'system': sample['system'],
+            'database': sample['database'],
+            'pool': sample['pool'],
+            'sampled_at': sample['sampled_at']
         }
         
-        # Database connectivity check
-        try:
-            from ..database import db
-            db.session.execute('SELECT 1')
-            health_data['database'] = 'connected'
-        except Exception as e:
-            health_data['database'] = 'disconnected'
-            health_data['database_error'] = str(e)
+        # Database connectivity, as of the last probe
+        if sample['database'] == 'connected':
+            health_data['database_latency_ms'] = sample['database_latency_ms']
+        else:
+            health_data['database_error'] = sample['database_error']
+            health_data['status'] = 'degraded'
+        
+        if health_sampler.is_stale(sample):
             health_data['status'] = 'degraded'
+            health_data['error'] = 'Health sampler has stopped reporting'
         
         # Determine overall status
         status_code = 200 if health_data['status'] == 'healthy' else 503
@@ -52,16 +54,18 @@ def health_check():
 def readiness_check():
     """
     Readiness check for Kubernetes and container orchestration
-    Returns 200 when service is ready to accept traffic
+    Returns 200 when a pooled database connection answers in time
     """
     try:
         # Check database connection
-        from ..database import db
-        db.session.execute('SELECT 1')
+        latency_ms = probe_database(
+            db.engine, current_app.config.get('HEALTH_DB_TIMEOUT_MS', DEFAULT_DB_TIMEOUT_MS)
+        )
         
         return jsonify({
             'status': 'ready',
-            'timestamp': datetime.utcnow().isoformat()
+            'timestamp': datetime.utcnow().isoformat(),
+            'database_latency_ms': latency_ms
         }), 200
         
     except Exception as e:
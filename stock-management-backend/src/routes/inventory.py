@@ -2,7 +2,13 @@ from flask import Blueprint, jsonify, request
 from src.models.inventory import Inventory, db
 from src.models.product import Product
 from src.models.location import Location
-from sqlalchemy import func
+from src.models.location_stock_summary import LocationStockSummary
+from src.services.serialization import eager_load_options, serialization_args
+from src.services.inventory import InventoryError, ledger_entry, set_quantity, write_ledger
+from src.services.search import apply_product_search, with_search_fallback
+from src.services.snapshots import stock_as_of_report
+from datetime import datetime, time
+from src.routes.auth import current_user_id
 
 inventory_bp = Blueprint('inventory', __name__)
 
@@ -11,39 +17,54 @@ def get_inventory():
     location_id = request.args.get('location_id', type=int)
     search = request.args.get('search', '')
     low_stock = request.args.get('low_stock', type=bool)
+    fields, expand = serialization_args(request.args)
+    
+    def fetch():
+        query = Inventory.query.options(*eager_load_options(Inventory, fields, expand))
+        
+        if search or low_stock:
+            query = query.join(Product)
+        
+        if location_id:
+            query = query.filter(Inventory.location_id == location_id)
+        
+        if search:
+            query = apply_product_search(query, search)
+        
+        if low_stock:
+            query = query.filter(Inventory.quantity <= Product.reorder_point)
+        
+        return query.all()
+    
+    results = with_search_fallback(fetch)
+    
+    return jsonify([inventory.to_dict(fields, expand) for inventory in results])
+
+@inventory_bp.route('/inventory/as-of', methods=['GET'])
+def get_inventory_as_of():
+    """Get a location's stock on hand at a past date or time
+
+    A bare date (``at=2025-03-01``) means the end of that day.
+    """
+    location_id = request.args.get('location_id', type=int)
+    at = request.args.get('at')
     
-    query = db.session.query(
-        Inventory,
-        Product,
-        Location
-    ).join(Product).join(Location)
-    
-    if location_id:
-        query = query.filter(Inventory.location_id == location_id)
-    
-    if search:
-        query = query.filter(
-            (Product.name.contains(search)) |
-            (Product.sku.contains(search))
-        )
-    
-    if low_stock:
-        query = query.filter(Inventory.quantity <= Product.reorder_point)
+    if not location_id or not at:
+        return jsonify({'error': 'location_id and at are required'}), 400
     
-    results = query.all()
+    try:
+        as_of = datetime.fromisoformat(at)
+    except ValueError:
+        return jsonify({'error': 'at must be an ISO date or datetime'}), 400
     
-    inventory_list = []
-    for inventory, product, location in results:
-        item = inventory.to_dict()
-        item['product'] = product.to_dict()
-        item['location'] = location.to_dict()
-        inventory_list.append(item)
+    if len(at) == 10:
+        as_of = datetime.combine(as_of.date(), time.max)
     
-    return jsonify(inventory_list)
+    return jsonify(stock_as_of_report(location_id, as_of))
 
 @inventory_bp.route('/inventory/<int:product_id>/<int:location_id>', methods=['GET'])
 def get_inventory_item(product_id, location_id):
-    inventory = Inventory.query.filter_by(
+    inventory = Inventory.query.options(*eager_load_options(Inventory)).filter_by(
         product_id=product_id, 
         location_id=location_id
     ).first_or_404()
@@ -54,35 +75,38 @@ def adjust_inventory():
     """Adjust inventory quantity (for damaged goods, corrections, etc.)"""
     data = request.json
     
-    inventory = Inventory.query.filter_by(
-        product_id=data['product_id'],
-        location_id=data['location_id']
-    ).first()
+    if data['new_quantity'] < 0:
+        return jsonify({'error': 'new_quantity cannot be negative'}), 400
     
-    if not inventory:
-        inventory = Inventory(
-            product_id=data['product_id'],
-            location_id=data['location_id'],
-            quantity=0
-        )
-        db.session.add(inventory)
+    user_id = data.get('user_id') or current_user_id()
+    if not user_id:
+        return jsonify({'error': 'user_id is required'}), 400
     
-    old_quantity = inventory.quantity
-    inventory.quantity = data['new_quantity']
+    try:
+        change = set_quantity(data['product_id'], data['location_id'], data['new_quantity'])
+    except InventoryError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 409
     
     # Create transaction record
-    from src.models.stock_transaction import StockTransaction
-    transaction = StockTransaction(
-        product_id=data['product_id'],
-        location_id=data['location_id'],
-        transaction_type='adjustment',
-        quantity=data['new_quantity'] - old_quantity,
-        reference_id=None,
-        notes=data.get('reason', 'Manual adjustment')
-    )
-    db.session.add(transaction)
+    if change:
+        write_ledger([
+            ledger_entry(
+                data['product_id'],
+                data['location_id'],
+                change,
+                'adjustment',
+                user_id,
+                data.get('reason', 'Manual adjustment')
+            )
+        ])
     
     db.session.commit()
+    
+    inventory = Inventory.query.options(*eager_load_options(Inventory)).filter_by(
+        product_id=data['product_id'],
+        location_id=data['location_id']
+    ).populate_existing().first()
     return jsonify(inventory.to_dict())
 
 @inventory_bp.route('/inventory/summary', methods=['GET'])
@@ -90,19 +114,18 @@ def get_inventory_summary():
     """Get inventory summary by location"""
     location_id = request.args.get('location_id', type=int)
     
+    # Read the maintained per-location totals: O(locations), not O(inventory)
     query = db.session.query(
         Location.name.label('location_name'),
-        func.count(Inventory.id).label('total_products'),
-        func.sum(Inventory.quantity).label('total_quantity'),
-        func.count(
-            func.case([(Inventory.quantity <= Product.reorder_point, 1)])
-        ).label('low_stock_count')
-    ).join(Inventory).join(Product)
+        LocationStockSummary.total_products,
+        LocationStockSummary.total_quantity,
+        LocationStockSummary.low_stock_count
+    ).join(Location, LocationStockSummary.location_id == Location.id)
     
     if location_id:
-        query = query.filter(Location.id == location_id)
+        query = query.filter(LocationStockSummary.location_id == location_id)
     
-    results = query.group_by(Location.id, Location.name).all()
+    results = query.order_by(Location.id).all()
     
     summary = []
     for result in results:
@@ -114,4 +137,3 @@ def get_inventory_summary():
         })
     
     return jsonify(summary)
-
@@ -1,11 +1,13 @@
 from flask import Blueprint, jsonify, request
 from src.models.location import Location, db
 from src.routes.auth import login_required, admin_required
+from src.services.conditional import conditional_on
 
 location_bp = Blueprint('location', __name__)
 
 @location_bp.route('/locations', methods=['GET'])
 @login_required
+@conditional_on(Location)
 def get_locations():
     """Get all locations"""
     try:
@@ -2,37 +2,44 @@ from flask import Blueprint, jsonify, request
 from src.models.product import Product, db
 from src.models.brand import Brand
 from src.models.supplier import Supplier
+from src.services.serialization import eager_load_options, serialization_args
+from src.services.stock_summary import reorder_point_changed
+from src.services.search import apply_product_search, index_product, unindex_product, with_search_fallback
+from src.services.conditional import conditional_on
 
 product_bp = Blueprint('product', __name__)
 
 @product_bp.route('/products', methods=['GET'])
+# Products nest their brand and supplier
+@conditional_on(Product, Brand, Supplier)
 def get_products():
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
     search = request.args.get('search', '')
     brand_id = request.args.get('brand_id', type=int)
     supplier_id = request.args.get('supplier_id', type=int)
+    fields, expand = serialization_args(request.args)
     
-    query = Product.query
-    
-    if search:
-        query = query.filter(
-            (Product.name.contains(search)) |
-            (Product.sku.contains(search))
+    def fetch():
+        query = Product.query.options(*eager_load_options(Product, fields, expand))
+        
+        if search:
+            query = apply_product_search(query, search)
+        
+        if brand_id:
+            query = query.filter(Product.brand_id == brand_id)
+        
+        if supplier_id:
+            query = query.filter(Product.supplier_id == supplier_id)
+        
+        return query.paginate(
+            page=page, per_page=per_page, error_out=False
         )
     
-    if brand_id:
-        query = query.filter(Product.brand_id == brand_id)
-    
-    if supplier_id:
-        query = query.filter(Product.supplier_id == supplier_id)
-    
-    products = query.paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    products = with_search_fallback(fetch)
     
     return jsonify({
-        'products': [product.to_dict() for product in products.items],
+        'products': [product.to_dict(fields, expand) for product in products.items],
         'total': products.total,
         'pages': products.pages,
         'current_page': page
@@ -52,6 +59,8 @@ def create_product():
         image_url=data.get('image_url')
     )
     db.session.add(product)
+    db.session.flush()
+    index_product(product)
     db.session.commit()
     return jsonify(product.to_dict()), 201
 
@@ -70,8 +79,12 @@ def update_product(product_id):
     product.supplier_id = data.get('supplier_id', product.supplier_id)
     product.category = data.get('category', product.category)
     product.unit = data.get('unit', product.unit)
+    old_reorder_point = product.reorder_point
     product.reorder_point = data.get('reorder_point', product.reorder_point)
     product.image_url = data.get('image_url', product.image_url)
+    db.session.flush()
+    reorder_point_changed(product.id, old_reorder_point, product.reorder_point)
+    index_product(product)
     db.session.commit()
     return jsonify(product.to_dict())
 
@@ -79,6 +92,7 @@ def update_product(product_id):
 def delete_product(product_id):
     product = Product.query.get_or_404(product_id)
     db.session.delete(product)
+    unindex_product(product_id)
     db.session.commit()
     return '', 204
 
@@ -1,12 +1,18 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, url_for
 from src.models.inventory import Inventory, db
 from src.models.product import Product
 from src.models.location import Location
-from src.models.supplier import Supplier
-from src.models.daily_count import DailyCount
+from src.models.location_stock_summary import LocationStockSummary
 from src.models.stock_transaction import StockTransaction
-from datetime import datetime, timedelta
-from sqlalchemy import func, and_
+from src.models.report_job import ReportJob
+from src.routes.auth import current_claims, login_required
+from src.services.serialization import eager_load_options
+from src.services.purchasing import build_purchase_suggestions, build_usage_analysis
+from src.services.export import EXPORT_FORMATS, export_response, transaction_rows
+from src.services.movements import GRANULARITIES, movement_report
+from src.services.report_jobs import ReportJobError, ReportQueueFull, can_read_job, job_status, submit_report_job
+from datetime import datetime
+from sqlalchemy import and_
 
 reports_bp = Blueprint('reports', __name__)
 
@@ -47,75 +53,21 @@ def get_low_stock_report():
 @reports_bp.route('/reports/purchase-suggestion', methods=['GET'])
 def get_purchase_suggestion():
     """Generate purchase suggestion list grouped by supplier"""
-    # Get products with low stock in central warehouse only
-    central_warehouse_id = 1  # Assuming central warehouse has ID 1
-    
-    low_stock_query = db.session.query(
-        Inventory,
-        Product,
-        Supplier
-    ).join(Product).join(Supplier, Product.supplier_id == Supplier.id).filter(
-        and_(
-            Inventory.location_id == central_warehouse_id,
-            Inventory.quantity <= Product.reorder_point
-        )
-    )
-    
-    results = low_stock_query.all()
-    
-    # Calculate suggested order quantities based on usage history
-    suggestions_by_supplier = {}
-    
-    for inventory, product, supplier in results:
-        # Calculate average daily usage for the last 30 days
-        thirty_days_ago = datetime.now().date() - timedelta(days=30)
-        
-        usage_query = db.session.query(
-            func.avg(DailyCount.calculated_usage)
-        ).filter(
-            and_(
-                DailyCount.product_id == product.id,
-                DailyCount.count_date >= thirty_days_ago,
-                DailyCount.calculated_usage > 0
-            )
-        )
-        
-        avg_usage = usage_query.scalar() or 0
-        
-        # Suggest ordering for 30 days supply
-        suggested_quantity = max(
-            product.reorder_point - inventory.quantity,  # Minimum to reach reorder point
-            int(avg_usage * 30)  # 30 days supply
-        )
-        
-        if supplier.id not in suggestions_by_supplier:
-            suggestions_by_supplier[supplier.id] = {
-                'supplier_id': supplier.id,
-                'supplier_name': supplier.name,
-                'supplier_contact': supplier.contact_info,
-                'products': []
-            }
-        
-        suggestions_by_supplier[supplier.id]['products'].append({
-            'product_id': product.id,
-            'product_name': product.name,
-            'sku': product.sku,
-            'current_quantity': inventory.quantity,
-            'reorder_point': product.reorder_point,
-            'avg_daily_usage': float(avg_usage),
-            'suggested_quantity': suggested_quantity,
-            'unit_price': product.unit_price
-        })
-    
-    return jsonify(list(suggestions_by_supplier.values()))
+    warehouse_id = request.args.get('warehouse_id', type=int)
+    return jsonify(build_purchase_suggestions(warehouse_id))
 
 @reports_bp.route('/reports/inventory-movement', methods=['GET'])
 def get_inventory_movement_report():
-    """Get inventory movement report"""
+    """Get inventory movement report
+
+    With ``granularity`` (day, week or month) totals per period are read
+    from the daily movement rollup instead of listing every transaction.
+    """
     location_id = request.args.get('location_id', type=int)
     product_id = request.args.get('product_id', type=int)
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
+    granularity = request.args.get('granularity')
     
     if not start_date or not end_date:
         return jsonify({'error': 'start_date and end_date are required'}), 400
@@ -123,11 +75,17 @@ def get_inventory_movement_report():
     start_dt = datetime.fromisoformat(start_date)
     end_dt = datetime.fromisoformat(end_date)
     
-    query = db.session.query(
-        StockTransaction,
-        Product,
-        Location
-    ).join(Product).join(Location).filter(
+    if granularity:
+        if granularity not in GRANULARITIES:
+            return jsonify({'error': 'granularity must be day, week or month'}), 400
+        return jsonify(movement_report(
+            start_dt.date(), end_dt.date(), granularity,
+            location_id=location_id, product_id=product_id
+        ))
+    
+    query = StockTransaction.query.options(
+        *eager_load_options(StockTransaction)
+    ).filter(
         and_(
             StockTransaction.created_at >= start_dt,
             StockTransaction.created_at <= end_dt
@@ -135,7 +93,7 @@ def get_inventory_movement_report():
     )
     
     if location_id:
-        query = query.filter(StockTransaction.location_id == location_id)
+        query = query.filter(StockTransaction.involving_location(location_id))
     
     if product_id:
         query = query.filter(StockTransaction.product_id == product_id)
@@ -144,14 +102,29 @@ def get_inventory_movement_report():
     
     results = query.all()
     
-    movements = []
-    for transaction, product, location in results:
-        movement = transaction.to_dict()
-        movement['product'] = product.to_dict()
-        movement['location'] = location.to_dict()
-        movements.append(movement)
+    return jsonify([transaction.to_dict() for transaction in results])
+
+@reports_bp.route('/reports/inventory-movement/export', methods=['GET'])
+def export_inventory_movement_report():
+    """Stream the inventory movement report as CSV or NDJSON (format=csv|ndjson)"""
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    export_format = request.args.get('format', 'csv')
     
-    return jsonify(movements)
+    if not start_date or not end_date:
+        return jsonify({'error': 'start_date and end_date are required'}), 400
+    
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': 'format must be csv or ndjson'}), 400
+    
+    stmt = transaction_rows(
+        location_id=request.args.get('location_id', type=int),
+        product_id=request.args.get('product_id', type=int),
+        start_dt=datetime.fromisoformat(start_date),
+        end_dt=datetime.fromisoformat(end_date)
+    )
+    
+    return export_response(stmt, export_format, f'inventory-movement-{start_date}-{end_date}')
 
 @reports_bp.route('/reports/stock-summary', methods=['GET'])
 def get_stock_summary_report():
@@ -159,17 +132,12 @@ def get_stock_summary_report():
     query = db.session.query(
         Location.id.label('location_id'),
         Location.name.label('location_name'),
-        func.count(Inventory.id).label('total_products'),
-        func.sum(Inventory.quantity).label('total_quantity'),
-        func.sum(
-            func.case([(Inventory.quantity <= Product.reorder_point, 1)], else_=0)
-        ).label('low_stock_count'),
-        func.sum(
-            Product.unit_price * Inventory.quantity
-        ).label('total_value')
-    ).select_from(Location).outerjoin(Inventory).outerjoin(Product).group_by(
-        Location.id, Location.name
-    )
+        LocationStockSummary.total_products,
+        LocationStockSummary.total_quantity,
+        LocationStockSummary.low_stock_count
+    ).select_from(Location).outerjoin(
+        LocationStockSummary, LocationStockSummary.location_id == Location.id
+    ).order_by(Location.id)
     
     results = query.all()
     
@@ -180,8 +148,7 @@ def get_stock_summary_report():
             'location_name': result.location_name,
             'total_products': result.total_products or 0,
             'total_quantity': result.total_quantity or 0,
-            'low_stock_count': result.low_stock_count or 0,
-            'total_value': float(result.total_value or 0)
+            'low_stock_count': result.low_stock_count or 0
         })
     
     return jsonify(summary)
@@ -191,43 +158,37 @@ def get_usage_analysis():
     """Get usage analysis report"""
     location_id = request.args.get('location_id', type=int)
     days = request.args.get('days', 30, type=int)
-    
-    end_date = datetime.now().date()
-    start_date = end_date - timedelta(days=days)
-    
-    query = db.session.query(
-        Product.id.label('product_id'),
-        Product.name.label('product_name'),
-        Product.sku,
-        func.sum(DailyCount.calculated_usage).label('total_usage'),
-        func.avg(DailyCount.calculated_usage).label('avg_daily_usage'),
-        func.count(DailyCount.id).label('count_days')
-    ).select_from(Product).join(DailyCount).filter(
-        and_(
-            DailyCount.count_date >= start_date,
-            DailyCount.count_date <= end_date
-        )
-    )
-    
-    if location_id:
-        query = query.filter(DailyCount.location_id == location_id)
-    
-    query = query.group_by(Product.id, Product.name, Product.sku)
-    query = query.order_by(func.sum(DailyCount.calculated_usage).desc())
-    
-    results = query.all()
-    
-    analysis = []
-    for result in results:
-        analysis.append({
-            'product_id': result.product_id,
-            'product_name': result.product_name,
-            'sku': result.sku,
-            'total_usage': float(result.total_usage or 0),
-            'avg_daily_usage': float(result.avg_daily_usage or 0),
-            'count_days': result.count_days,
-            'usage_trend': 'high' if (result.avg_daily_usage or 0) > 10 else 'medium' if (result.avg_daily_usage or 0) > 5 else 'low'
-        })
-    
-    return jsonify(analysis)
+    return jsonify(build_usage_analysis(location_id, days))
+
+@reports_bp.route('/reports/jobs', methods=['POST'])
+@login_required
+def create_report_job():
+    """Queue a report to be built in the background
+
+    Body: ``{"report_type": "usage-analysis", "params": {"days": 365}}``.
+    Poll the returned job's URL until its status is succeeded or failed.
+    """
+    data = request.get_json() or {}
+    try:
+        job, created = submit_report_job(data.get('report_type'), data.get('params'), current_claims())
+    except ReportQueueFull as e:
+        return jsonify({'error': str(e)}), 503
+    except ReportJobError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    response = jsonify(job_status(job))
+    response.status_code = 200 if job.status == 'succeeded' else 202
+    response.headers['Location'] = url_for('reports.get_report_job', job_id=job.id)
+    return response
+
+@reports_bp.route('/reports/jobs/<job_id>', methods=['GET'])
+@login_required
+def get_report_job(job_id):
+    """Get a report job's status, with the report once it has succeeded
 
+    Non-admins see their own jobs and jobs for their location only.
+    """
+    job = db.session.get(ReportJob, job_id)
+    if job is None or not can_read_job(job, current_claims()):
+        return jsonify({'error': 'Report job not found'}), 404
+    return jsonify(job_status(job))
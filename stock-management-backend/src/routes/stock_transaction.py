@@ -1,8 +1,13 @@
 from flask import Blueprint, jsonify, request
 from src.models.stock_transaction import StockTransaction, db
-from src.models.inventory import Inventory
-from src.models.product import Product
-from src.models.location import Location
+from src.services.serialization import eager_load_options, serialization_args
+from src.services.pagination import keyset_paginate
+from src.services.inventory import (
+    InventoryError, MAX_RECEIPT_LINES, change_quantity, ledger_entry,
+    receive_stock, transfer_stock, write_ledger
+)
+from src.services.export import EXPORT_FORMATS, export_response, transaction_rows
+from src.routes.auth import current_user_id
 from datetime import datetime
 
 stock_transaction_bp = Blueprint('stock_transaction', __name__)
@@ -12,96 +17,94 @@ def stock_in():
     """Record stock received at central warehouse"""
     data = request.json
     
+    if data['quantity'] <= 0:
+        return jsonify({'error': 'quantity must be positive'}), 400
+    
+    user_id = data.get('user_id') or current_user_id()
+    if not user_id:
+        return jsonify({'error': 'user_id is required'}), 400
+    
+    # Update inventory (single upsert, safe against concurrent receipts)
+    change_quantity(data['product_id'], data['location_id'], data['quantity'])
+    
     # Create transaction record
-    transaction = StockTransaction(
-        product_id=data['product_id'],
-        location_id=data['location_id'],  # Should be central warehouse
-        transaction_type='stock_in',
-        quantity=data['quantity'],
-        supplier_id=data.get('supplier_id'),
-        notes=data.get('notes', '')
-    )
-    db.session.add(transaction)
-    
-    # Update inventory
-    inventory = Inventory.query.filter_by(
-        product_id=data['product_id'],
-        location_id=data['location_id']
-    ).first()
-    
-    if not inventory:
-        inventory = Inventory(
-            product_id=data['product_id'],
-            location_id=data['location_id'],
-            quantity=data['quantity']
+    transaction, = write_ledger([
+        ledger_entry(
+            data['product_id'],
+            data['location_id'],  # Should be central warehouse
+            data['quantity'],
+            'stock_in',
+            user_id,
+            data.get('notes', '')
         )
-        db.session.add(inventory)
-    else:
-        inventory.quantity += data['quantity']
+    ], returning=True)
     
     db.session.commit()
     return jsonify(transaction.to_dict()), 201
 
+@stock_transaction_bp.route('/stock-in/receipt', methods=['POST'])
+def stock_in_receipt():
+    """Record a whole supplier delivery (many lines) in one transaction
+    
+    Body: {"location_id", "notes"?, "lines": [{"product_id", "quantity",
+    "notes"?}, ...]}. Either every line is booked or none is.
+    """
+    data = request.json or {}
+    lines = data.get('lines')
+    
+    if not data.get('location_id'):
+        return jsonify({'error': 'location_id is required'}), 400
+    
+    if not isinstance(lines, list) or not lines:
+        return jsonify({'error': 'lines must be a non-empty list'}), 400
+    
+    if len(lines) > MAX_RECEIPT_LINES:
+        return jsonify({'error': f'At most {MAX_RECEIPT_LINES} lines per receipt'}), 400
+    
+    user_id = data.get('user_id') or current_user_id()
+    if not user_id:
+        return jsonify({'error': 'user_id is required'}), 400
+    
+    try:
+        on_hand = receive_stock(data['location_id'], lines, user_id, notes=data.get('notes'))
+    except InventoryError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'location_id': data['location_id'],
+        'lines': len(lines),
+        'total_quantity': sum(int(line['quantity']) for line in lines),
+        'inventory': [
+            {'product_id': product_id, 'quantity': quantity}
+            for product_id, quantity in sorted(on_hand.items())
+        ]
+    }), 201
+
 @stock_transaction_bp.route('/stock-transfer', methods=['POST'])
 def stock_transfer():
     """Transfer stock from central warehouse to store"""
     data = request.json
     
-    from_location_id = data['from_location_id']  # Central warehouse
-    to_location_id = data['to_location_id']      # Store
-    product_id = data['product_id']
-    quantity = data['quantity']
-    
-    # Check if enough stock in source location
-    source_inventory = Inventory.query.filter_by(
-        product_id=product_id,
-        location_id=from_location_id
-    ).first()
-    
-    if not source_inventory or source_inventory.quantity < quantity:
-        return jsonify({'error': 'Insufficient stock'}), 400
-    
-    # Create transfer out transaction
-    transfer_out = StockTransaction(
-        product_id=product_id,
-        location_id=from_location_id,
-        transaction_type='transfer_out',
-        quantity=-quantity,
-        notes=data.get('notes', f'Transfer to location {to_location_id}')
-    )
-    db.session.add(transfer_out)
-    
-    # Create transfer in transaction
-    transfer_in = StockTransaction(
-        product_id=product_id,
-        location_id=to_location_id,
-        transaction_type='transfer_in',
-        quantity=quantity,
-        reference_id=transfer_out.id,
-        notes=data.get('notes', f'Transfer from location {from_location_id}')
-    )
-    db.session.add(transfer_in)
-    
-    # Update source inventory
-    source_inventory.quantity -= quantity
-    
-    # Update destination inventory
-    dest_inventory = Inventory.query.filter_by(
-        product_id=product_id,
-        location_id=to_location_id
-    ).first()
-    
-    if not dest_inventory:
-        dest_inventory = Inventory(
-            product_id=product_id,
-            location_id=to_location_id,
-            quantity=quantity
+    user_id = data.get('user_id') or current_user_id()
+    if not user_id:
+        return jsonify({'error': 'user_id is required'}), 400
+    
+    # The source is only decremented if it still holds enough stock, in the
+    # same statement, so concurrent transfers cannot oversell
+    try:
+        transfer_out, transfer_in = transfer_stock(
+            data['product_id'],
+            data['from_location_id'],  # Central warehouse
+            data['to_location_id'],    # Store
+            data['quantity'],
+            user_id,
+            data.get('notes')
         )
-        db.session.add(dest_inventory)
-    else:
-        dest_inventory.quantity += quantity
+    except InventoryError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
     
-    db.session.commit()
     return jsonify({
         'transfer_out': transfer_out.to_dict(),
         'transfer_in': transfer_in.to_dict()
@@ -109,7 +112,11 @@ def stock_transfer():
 
 @stock_transaction_bp.route('/transactions', methods=['GET'])
 def get_transactions():
-    """Get transaction history"""
+    """Get transaction history
+
+    Pass ``cursor`` (empty for the first page) to page by (created_at, id)
+    instead of page numbers; ``include_total=true`` adds the total count.
+    """
     location_id = request.args.get('location_id', type=int)
     product_id = request.args.get('product_id', type=int)
     transaction_type = request.args.get('type')
@@ -117,11 +124,14 @@ def get_transactions():
     end_date = request.args.get('end_date')
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 50, type=int)
+    fields, expand = serialization_args(request.args)
     
-    query = StockTransaction.query
+    query = StockTransaction.query.options(
+        *eager_load_options(StockTransaction, fields, expand)
+    )
     
     if location_id:
-        query = query.filter(StockTransaction.location_id == location_id)
+        query = query.filter(StockTransaction.involving_location(location_id))
     
     if product_id:
         query = query.filter(StockTransaction.product_id == product_id)
@@ -137,6 +147,25 @@ def get_transactions():
         end_dt = datetime.fromisoformat(end_date)
         query = query.filter(StockTransaction.created_at <= end_dt)
     
+    cursor = request.args.get('cursor')
+    if cursor is not None:
+        try:
+            transactions = keyset_paginate(
+                query,
+                [StockTransaction.created_at, StockTransaction.id],
+                cursor=cursor,
+                per_page=per_page,
+                with_total=request.args.get('include_total') == 'true'
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify({
+            'transactions': [t.to_dict(fields, expand) for t in transactions.items],
+            'next_cursor': transactions.next_cursor,
+            'total': transactions.total
+        })
+    
     query = query.order_by(StockTransaction.created_at.desc())
     
     transactions = query.paginate(
@@ -144,14 +173,36 @@ def get_transactions():
     )
     
     return jsonify({
-        'transactions': [t.to_dict() for t in transactions.items],
+        'transactions': [t.to_dict(fields, expand) for t in transactions.items],
         'total': transactions.total,
         'pages': transactions.pages,
         'current_page': page
     })
 
+@stock_transaction_bp.route('/transactions/export', methods=['GET'])
+def export_transactions():
+    """Stream transaction history as CSV or NDJSON (format=csv|ndjson)"""
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': 'format must be csv or ndjson'}), 400
+    
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    
+    stmt = transaction_rows(
+        location_id=request.args.get('location_id', type=int),
+        product_id=request.args.get('product_id', type=int),
+        transaction_type=request.args.get('type'),
+        start_dt=datetime.fromisoformat(start_date) if start_date else None,
+        end_dt=datetime.fromisoformat(end_date) if end_date else None
+    )
+    
+    return export_response(stmt, export_format, 'transactions')
+
 @stock_transaction_bp.route('/transactions/<int:transaction_id>', methods=['GET'])
 def get_transaction(transaction_id):
-    transaction = StockTransaction.query.get_or_404(transaction_id)
+    transaction = StockTransaction.query.options(
+        *eager_load_options(StockTransaction)
+    ).filter_by(id=transaction_id).first_or_404()
     return jsonify(transaction.to_dict())
 
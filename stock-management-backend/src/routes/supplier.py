@@ -1,9 +1,11 @@
 from flask import Blueprint, jsonify, request
 from src.models.supplier import Supplier, db
+from src.services.conditional import conditional_on
 
 supplier_bp = Blueprint('supplier', __name__)
 
 @supplier_bp.route('/suppliers', methods=['GET'])
+@conditional_on(Supplier)
 def get_suppliers():
     suppliers = Supplier.query.all()
     return jsonify([supplier.to_dict() for supplier in suppliers])
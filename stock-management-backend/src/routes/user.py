@@ -1,11 +1,13 @@
 from flask import Blueprint, jsonify, request
 from src.models.user import User, db
+from src.services.serialization import eager_load_options
+from src.services.auth_tokens import token_versions
 
 user_bp = Blueprint('user', __name__)
 
 @user_bp.route('/users', methods=['GET'])
 def get_users():
-    users = User.query.all()
+    users = User.query.options(*eager_load_options(User)).all()
     return jsonify([user.to_dict() for user in users])
 
 @user_bp.route('/users', methods=['POST'])
@@ -36,4 +38,5 @@ def delete_user(user_id):
     user = User.query.get_or_404(user_id)
     db.session.delete(user)
     db.session.commit()
+    token_versions.forget(user_id)
     return '', 204
@@ -0,0 +1,85 @@
+from src.models.user import User, db
+from flask import current_app
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+import threading
+import time
+
+TOKEN_SALT = 'auth-token'
+DEFAULT_MAX_AGE = 12 * 60 * 60
+DEFAULT_REVOCATION_TTL = 30
+
+
+class TokenVersions:
+    """Per-process view of each user's token version.
+
+    A token is accepted only while its version matches the user's
+    token_version column. The column is read at most once per user per
+    AUTH_REVOCATION_TTL seconds, so verification is a dict lookup; a
+    revocation applies at once in the worker that made it and within the
+    TTL everywhere else.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions = {}
+
+    def current(self, user_id):
+        """Token version currently valid for a user, None if they cannot log in"""
+        ttl = current_app.config.get('AUTH_REVOCATION_TTL', DEFAULT_REVOCATION_TTL)
+        entry = self._versions.get(user_id)
+        if entry and entry[1] > time.monotonic():
+            return entry[0]
+
+        row = db.session.query(User.token_version, User.is_active).filter(User.id == user_id).first()
+        version = row.token_version if row and row.is_active else None
+        self._remember(user_id, version, ttl)
+        return version
+
+    def revoke(self, user):
+        """Invalidate every token issued to a user; the caller commits"""
+        user.token_version = (user.token_version or 0) + 1
+        self.forget(user.id)
+
+    def forget(self, user_id):
+        with self._lock:
+            self._versions.pop(user_id, None)
+
+    def _remember(self, user_id, version, ttl):
+        with self._lock:
+            self._versions[user_id] = (version, time.monotonic() + ttl)
+
+
+token_versions = TokenVersions()
+
+
+def _serializer():
+    return URLSafeTimedSerializer(current_app.secret_key, salt=TOKEN_SALT)
+
+
+def issue_token(user):
+    """Signed token carrying the claims needed to authorize requests
+
+    Only identity and authorization are carried; profile fields can change
+    without a new token, so /me reads them from the database. Revoke a
+    user's tokens when their role or location changes.
+    """
+    return _serializer().dumps({
+        'uid': user.id,
+        'ver': user.token_version or 0,
+        'role': user.role,
+        'loc': user.location_id
+    })
+
+
+def verify_token(token):
+    """Claims of a valid, unrevoked token, or None"""
+    max_age = current_app.config.get('AUTH_TOKEN_MAX_AGE', DEFAULT_MAX_AGE)
+    try:
+        claims = _serializer().loads(token, max_age=max_age)
+    except BadSignature:
+        return None
+
+    if claims.get('ver') != token_versions.current(claims.get('uid')):
+        return None
+    return claims
+
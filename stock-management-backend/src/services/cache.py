@@ -0,0 +1,214 @@
+import logging
+import threading
+import time
+from functools import wraps
+from itertools import chain
+from flask import Response, current_app, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 60
+MAX_MEMORY_ENTRIES = 2048
+ALL_LOCATIONS = 'all'
+
+
+class MemoryBackend:
+    """Per-process cache store; invalidation only reaches this worker.
+
+    Under several workers, one worker's commits leave the others' entries
+    in place until they expire, so dashboards can lag writes by up to the
+    TTL. Use Redis where that matters.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._versions = {}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[1] > time.monotonic():
+                return entry[0]
+            return None
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            if len(self._entries) >= MAX_MEMORY_ENTRIES:
+                now = time.monotonic()
+                self._entries = {k: v for k, v in self._entries.items() if v[1] > now}
+                if len(self._entries) >= MAX_MEMORY_ENTRIES:
+                    self._entries.clear()
+            self._entries[key] = (value, time.monotonic() + ttl)
+
+    def version(self, scope):
+        with self._lock:
+            return self._versions.get(scope, 0)
+
+    def bump(self, scope):
+        with self._lock:
+            self._versions[scope] = self._versions.get(scope, 0) + 1
+
+
+class RedisBackend:
+    """Cache store shared by every worker through Redis"""
+
+    def __init__(self, client, prefix='stock:cache:'):
+        self._client = client
+        self._prefix = prefix
+
+    def get(self, key):
+        return self._client.get(self._prefix + key)
+
+    def set(self, key, value, ttl):
+        # Redis rejects ex=0; no TTL means the entry lives until its version moves on
+        if ttl:
+            self._client.set(self._prefix + key, value, ex=ttl)
+        else:
+            self._client.set(self._prefix + key, value)
+
+    def version(self, scope):
+        return int(self._client.get(f'{self._prefix}version:{scope}') or 0)
+
+    def bump(self, scope):
+        self._client.incr(f'{self._prefix}version:{scope}')
+
+
+class ResultCache:
+    """Response cache whose entries are invalidated per location.
+
+    Each location has a version counter that is part of every cache key
+    for that location. Committing a stock change bumps the counters of
+    the touched locations (and of the all-locations scope), which orphans
+    their entries; the TTL only bounds staleness from writes that bypass
+    the tracked paths.
+
+    The counters live where the entries do. With Redis every worker sees a
+    bump at once; with the in-process fallback only the worker that
+    committed does, and other workers keep serving their entries for up
+    to DASHBOARD_CACHE_TTL seconds. A DASHBOARD_CACHE_TTL of 0 turns the
+    cache off.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._backend = None
+        self._backend_lock = threading.Lock()
+
+    def backend(self):
+        if self._backend is None:
+            with self._backend_lock:
+                if self._backend is None:
+                    self._backend = _make_backend(current_app.config.get('REDIS_URL'))
+        return self._backend
+
+    def key(self, endpoint, location_id, args):
+        scope = location_id or ALL_LOCATIONS
+        version = self.backend().version(scope)
+        return f'{self.name}:{endpoint}:{scope}:{version}:{args}'
+
+    def get(self, key):
+        return self.backend().get(key)
+
+    def set(self, key, value):
+        ttl = current_app.config.get('DASHBOARD_CACHE_TTL', DEFAULT_TTL)
+        if ttl:
+            self.backend().set(key, value, ttl)
+
+    def invalidate_locations(self, location_ids):
+        backend = self.backend()
+        for location_id in set(location_ids) | {ALL_LOCATIONS}:
+            backend.bump(location_id)
+
+
+def _make_backend(redis_url):
+    if redis_url:
+        try:
+            import redis
+            client = redis.Redis.from_url(redis_url)
+            client.ping()
+            return RedisBackend(client)
+        except Exception as e:
+            logger.warning('Redis cache unavailable (%s), using in-process cache', e)
+    return MemoryBackend()
+
+
+dashboard_cache = ResultCache('dashboard')
+
+
+def cached_by_location(cache):
+    """Cache a JSON view's 200 responses, keyed by endpoint and query args"""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            location_id = request.args.get('location_id', type=int)
+            query = '&'.join(f'{k}={v}' for k, v in sorted(request.args.items(multi=True)))
+            key = cache.key(request.endpoint, location_id, query)
+
+            body = cache.get(key)
+            if body is not None:
+                return Response(body, mimetype='application/json')
+
+            response = current_app.make_response(f(*args, **kwargs))
+            if response.status_code == 200:
+                cache.set(key, response.get_data())
+            return response
+        return decorated_function
+    return decorator
+
+
+def mark_locations_changed(session, location_ids):
+    """Record locations whose stock changed; caches are invalidated on commit"""
+    session.info.setdefault('changed_locations', set()).update(
+        location_id for location_id in location_ids if location_id
+    )
+
+
+def table_versions(tables):
+    """Commit counters of tables, bumped by every commit that wrote to them.
+
+    They live in the cache backend, so with Redis every worker shares them;
+    in-process each worker counts only its own commits.
+    """
+    backend = dashboard_cache.backend()
+    return tuple(backend.version(f'table:{table}') for table in tables)
+
+
+def _mark_tables_changed(session, tables):
+    session.info.setdefault('changed_tables', set()).update(tables)
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_flushed_tables(session, flush_context):
+    # new, dirty and deleted still hold what was just flushed
+    _mark_tables_changed(session, {
+        instance.__table__.name
+        for instance in chain(session.new, session.dirty, session.deleted)
+    })
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _track_executed_tables(orm_execute_state):
+    # INSERT, UPDATE and DELETE statements that bypass the unit of work
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        _mark_tables_changed(orm_execute_state.session, {orm_execute_state.statement.table.name})
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session):
+    changed = session.info.pop('changed_locations', None)
+    if changed:
+        dashboard_cache.invalidate_locations(changed)
+    tables = session.info.pop('changed_tables', None)
+    if tables:
+        backend = dashboard_cache.backend()
+        for table in tables:
+            backend.bump(f'table:{table}')
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_after_rollback(session):
+    session.info.pop('changed_locations', None)
+    session.info.pop('changed_tables', None)
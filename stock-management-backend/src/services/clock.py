@@ -0,0 +1,6 @@
+from datetime import datetime, timezone
+
+
+def utc_now():
+    """Current UTC time without tzinfo, as CURRENT_TIMESTAMP stamps ledger rows"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
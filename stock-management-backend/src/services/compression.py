@@ -0,0 +1,69 @@
+import gzip
+import zlib
+from flask import request
+
+# Bodies smaller than this go out as they are; compressing them saves little
+DEFAULT_MIN_SIZE = 1024
+DEFAULT_LEVEL = 6
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/javascript',
+    'text/csv',
+    'text/css',
+    'text/html',
+    'text/plain',
+}
+
+
+def _gzip(data, level):
+    # A fixed mtime keeps the output identical for identical bodies
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def _deflate(data, level):
+    # HTTP "deflate" is the zlib-wrapped stream
+    return zlib.compress(data, level)
+
+
+_ENCODERS = {
+    'gzip': _gzip,
+    'deflate': _deflate,
+}
+
+
+def _compress_response(app, response):
+    if (response.status_code < 200 or response.status_code >= 300
+            or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    response.vary.add('Accept-Encoding')
+
+    data = response.get_data()
+    if len(data) < app.config.get('COMPRESS_MIN_SIZE', DEFAULT_MIN_SIZE):
+        return response
+
+    encoding = request.accept_encodings.best_match(list(_ENCODERS))
+    if encoding is None:
+        return response
+
+    response.set_data(_ENCODERS[encoding](data, app.config.get('COMPRESS_LEVEL', DEFAULT_LEVEL)))
+    response.headers['Content-Encoding'] = encoding
+    # The bytes differ from the uncompressed variant, so a strong tag no longer holds
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_compression(app):
+    """Compress buffered responses with gzip or deflate, as the client accepts.
+
+    Streamed responses (the CSV/NDJSON exports) and static files are left
+    alone, as are bodies under COMPRESS_MIN_SIZE bytes.
+    """
+    @app.after_request
+    def compress_response(response):
+        return _compress_response(app, response)
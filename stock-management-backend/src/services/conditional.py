@@ -0,0 +1,54 @@
+import hashlib
+from functools import wraps
+from flask import current_app, request
+from sqlalchemy import func, select
+from werkzeug.http import is_resource_modified
+from src.models.user import db
+from src.services.cache import table_versions
+
+
+def table_state(models):
+    """Latest updated_at and row count of each model's table, in one query"""
+    columns = []
+    for model in models:
+        columns.append(select(func.max(model.updated_at)).scalar_subquery())
+        columns.append(select(func.count()).select_from(model).scalar_subquery())
+    return tuple(db.session.execute(select(*columns)).one())
+
+
+def conditional_on(*models):
+    """Answer GETs with 304 while the tables a list is built from are unchanged.
+
+    The validator is the newest updated_at, the row count and the commit
+    counter (see table_versions) of every table the response reads,
+    hashed with the request path and query so each page and filter gets
+    its own ETag. The counter catches a second edit within the same
+    second, which updated_at's one-second resolution misses; the
+    aggregates catch writes the counters do not see, such as another
+    worker's commits without Redis. Checking it costs one aggregate
+    query; rows are only loaded and serialized on a miss.
+
+    No Last-Modified is sent: max(updated_at) does not move when a row is
+    deleted, so If-Modified-Since would keep answering 304 for a list that
+    lost a row. Only If-None-Match is honoured.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            state = table_state(models) + table_versions(model.__tablename__ for model in models)
+            etag = hashlib.sha1(f'{request.full_path}|{state!r}'.encode('utf-8')).hexdigest()
+
+            if not is_resource_modified(request.environ, etag=etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = current_app.make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag, weak=True)
+            # Clients keep their copy but check back on every use
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+        return decorated_function
+    return decorator
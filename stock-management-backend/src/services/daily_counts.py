@@ -0,0 +1,210 @@
+from src.models.daily_count import DailyCount, db
+from src.models.inventory import Inventory
+from src.services.inventory import InventoryError, SET_QUANTITY_RETRIES, ledger_entry, write_ledger
+from src.services.cache import mark_locations_changed
+from src.services.stock_summary import apply_stock_changes
+from datetime import datetime
+from sqlalchemy import bindparam, case, insert, select, update
+
+MAX_BATCH_LINES = 5000
+# Ledger type of recounts and counts above book stock; transaction_type is String(20)
+COUNT_ADJUSTMENT = 'count_adjustment'
+
+
+def counted_usage():
+    """calculated_usage for aggregates: a count above book stock is zero usage, not negative"""
+    return case((DailyCount.calculated_usage < 0, 0), else_=DailyCount.calculated_usage)
+
+
+def _parse_line(line, default_date):
+    """Validate one count line into (product_id, location_id, count_date, counted_quantity)"""
+    if not isinstance(line, dict):
+        raise ValueError('Each count line must be an object')
+    try:
+        product_id = int(line['product_id'])
+        location_id = int(line['location_id'])
+        counted_quantity = int(line['counted_quantity'])
+    except KeyError as e:
+        raise ValueError(f'{e.args[0]} is required')
+    except (TypeError, ValueError):
+        raise ValueError('product_id, location_id and counted_quantity must be integers')
+
+    if counted_quantity < 0:
+        raise ValueError('counted_quantity cannot be negative')
+
+    count_date = default_date
+    if line.get('count_date'):
+        try:
+            count_date = datetime.fromisoformat(line['count_date']).date()
+        except (TypeError, ValueError):
+            raise ValueError('count_date must be an ISO date (YYYY-MM-DD)')
+
+    return product_id, location_id, count_date, counted_quantity
+
+
+def record_daily_counts(lines, user_id, default_date=None):
+    """Record a batch of physical counts and the usage they imply.
+
+    Inventory rows and existing counts for the whole batch are fetched with
+    one set-based SELECT each, new counts and ledger rows are written with
+    multi-row INSERTs and everything commits once. Returns one result per
+    input line, in order; lines that fail validation or have no inventory
+    record are reported and skipped without failing the batch.
+
+    Inventory rows are locked while the batch is worked out (FOR UPDATE on
+    PostgreSQL) and written with a compare-and-set on the quantity read,
+    so a transfer or stock-in committed meanwhile is never overwritten:
+    the batch is worked out again from the new figures instead. Raises
+    InventoryError if that keeps happening.
+    """
+    default_date = default_date or datetime.now().date()
+
+    parsed = []
+    for line in lines:
+        try:
+            parsed.append(_parse_line(line, default_date))
+        except ValueError as e:
+            parsed.append(e)
+
+    for _ in range(SET_QUANTITY_RETRIES):
+        results = _record_parsed(parsed, user_id)
+        if results is not None:
+            return results
+        db.session.rollback()
+
+    raise InventoryError('Inventory changed concurrently, please retry')
+
+
+def _record_parsed(parsed, user_id):
+    """One attempt at a batch; None if inventory changed after it was read"""
+    table = Inventory.__table__
+    valid = [p for p in parsed if not isinstance(p, Exception)]
+    product_ids = {p[0] for p in valid}
+    location_ids = {p[1] for p in valid}
+    count_dates = {p[2] for p in valid}
+
+    on_hand = {}
+    counts_by_key = {}
+    if valid:
+        rows = db.session.execute(
+            select(table.c.product_id, table.c.location_id, table.c.quantity).where(
+                table.c.product_id.in_(product_ids),
+                table.c.location_id.in_(location_ids)
+            ).with_for_update()
+        )
+        on_hand = {(row.product_id, row.location_id): row.quantity for row in rows}
+
+        for count in _counts_for(product_ids, location_ids, count_dates):
+            counts_by_key[(count.product_id, count.location_id, count.count_date)] = count
+
+    read_quantities = dict(on_hand)
+    counted_keys = set()
+    results = []
+    new_counts = {}
+    ledger_rows = []
+    stock_changes = {}
+    for index, line in enumerate(parsed):
+        if isinstance(line, Exception):
+            results.append({'index': index, 'status': 'error', 'error': str(line)})
+            continue
+
+        product_id, location_id, count_date, counted_quantity = line
+        key = (product_id, location_id, count_date)
+        quantity = on_hand.get((product_id, location_id))
+        if quantity is None:
+            results.append({'index': index, 'status': 'error', 'error': 'Product not found in this location'})
+            continue
+
+        # Anything missing since the last count (or since opening) was used
+        usage = quantity - counted_quantity
+
+        if key in counts_by_key or key in new_counts:
+            # A recount adds to (or gives back) the usage already recorded
+            if key in counts_by_key:
+                count = counts_by_key[key]
+                count.counted_quantity = counted_quantity
+                count.calculated_usage = (count.calculated_usage or 0) + usage
+                count.user_id = user_id
+            else:
+                count = new_counts[key]
+                count['counted_quantity'] = counted_quantity
+                count['calculated_usage'] += usage
+                count['user_id'] = user_id
+            status = 'updated'
+            record_usage = usage != 0
+            notes = f'Daily count adjustment for {count_date}'
+        else:
+            new_counts[key] = {
+                'product_id': product_id,
+                'location_id': location_id,
+                'user_id': user_id,
+                'count_date': count_date,
+                'counted_quantity': counted_quantity,
+                'calculated_usage': usage
+            }
+            status = 'created'
+            # A count above book stock is booked too, so the ledger explains every change
+            record_usage = usage != 0
+            notes = f'Daily usage for {count_date}'
+
+        stock_changes.setdefault(location_id, []).append((product_id, quantity, counted_quantity))
+        on_hand[(product_id, location_id)] = counted_quantity
+        counted_keys.add((product_id, location_id))
+
+        if record_usage:
+            ledger_rows.append(ledger_entry(
+                product_id, location_id, -usage,
+                'daily_usage' if status == 'created' and usage > 0 else COUNT_ADJUSTMENT,
+                user_id, notes
+            ))
+
+        results.append({'index': index, 'status': status, 'key': key})
+
+    # Every counted row is set from the quantity it was read at, in one
+    # executemany; a shortfall in matched rows means another writer got in
+    counted = [
+        {'b_product_id': product_id, 'b_location_id': location_id,
+         'b_read': read_quantities[(product_id, location_id)], 'b_quantity': on_hand[(product_id, location_id)]}
+        for product_id, location_id in counted_keys
+    ]
+    if counted:
+        written = db.session.execute(
+            update(table).where(
+                table.c.product_id == bindparam('b_product_id'),
+                table.c.location_id == bindparam('b_location_id'),
+                table.c.quantity == bindparam('b_read')
+            ).values(quantity=bindparam('b_quantity')),
+            counted
+        )
+        if written.rowcount != len(counted):
+            return None
+
+    # Recount updates go out as one executemany on flush; new counts and
+    # ledger rows as multi-row INSERTs without RETURNING
+    mark_locations_changed(db.session, location_ids)
+    db.session.flush()
+    for location_id, changes in stock_changes.items():
+        apply_stock_changes(location_id, changes)
+    if new_counts:
+        db.session.execute(insert(DailyCount), list(new_counts.values()))
+    write_ledger(ledger_rows)
+
+    if valid:
+        saved = {
+            (count.product_id, count.location_id, count.count_date): count.to_dict(expand={})
+            for count in _counts_for(product_ids, location_ids, count_dates)
+        }
+        for result in results:
+            if 'key' in result:
+                result['daily_count'] = saved[result.pop('key')]
+
+    db.session.commit()
+    return results
+
+
+def _counts_for(product_ids, location_ids, count_dates):
+    return DailyCount.query.filter(
+        DailyCount.product_id.in_(product_ids),
+        DailyCount.location_id.in_(location_ids),
+        DailyCount.count_date.in_(count_dates)
+    ).populate_existing()
@@ -0,0 +1,241 @@
+from src.models.inventory import Inventory, db
+from src.models.product import Product
+from src.models.location import Location
+from src.models.daily_count import DailyCount
+from src.models.stock_transaction import StockTransaction
+from src.models.location_stock_summary import LocationStockSummary
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from datetime import datetime, timedelta
+from sqlalchemy import cast, desc, func, select, Float
+from sqlalchemy.orm import Session
+import threading
+
+CENTRAL_WAREHOUSE_ID = 1
+TREND_DAYS = 7
+TOP_PRODUCTS_DAYS = 30
+RECENT_TRANSACTION_DAYS = 7
+
+# Shared by every bundle request, so concurrent sections never hold more
+# than this many extra connections however many dashboards are loading
+BUNDLE_WORKERS = 5
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _usage_by_day(session, location_id, since):
+    """Daily usage per product since a date; both usage sections aggregate this"""
+    query = session.query(
+        DailyCount.count_date.label('count_date'),
+        DailyCount.product_id.label('product_id'),
+        func.sum(DailyCount.calculated_usage).label('usage')
+    ).filter(DailyCount.count_date >= since)
+
+    if location_id:
+        query = query.filter(DailyCount.location_id == location_id)
+
+    return query.group_by(DailyCount.count_date, DailyCount.product_id).subquery()
+
+
+def overview(session, location_id=None):
+    """Headline counts, fetched as scalar subqueries of a single SELECT"""
+    since = datetime.now() - timedelta(days=RECENT_TRANSACTION_DAYS)
+
+    recent_transactions = select(func.count(StockTransaction.id)).where(
+        StockTransaction.created_at >= since
+    )
+    total_quantity = select(func.coalesce(func.sum(LocationStockSummary.total_quantity), 0))
+    if location_id:
+        recent_transactions = recent_transactions.where(StockTransaction.involving_location(location_id))
+        total_quantity = total_quantity.where(LocationStockSummary.location_id == location_id)
+
+    # Low stock alerts (central warehouse only)
+    low_stock_alerts = select(func.coalesce(func.sum(LocationStockSummary.low_stock_count), 0)).where(
+        LocationStockSummary.location_id == CENTRAL_WAREHOUSE_ID
+    )
+
+    row = session.execute(select(
+        select(func.count(Product.id)).scalar_subquery().label('total_products'),
+        select(func.count(Location.id)).scalar_subquery().label('total_locations'),
+        low_stock_alerts.scalar_subquery().label('low_stock_alerts'),
+        total_quantity.scalar_subquery().label('total_quantity'),
+        recent_transactions.scalar_subquery().label('recent_transactions')
+    )).one()
+
+    return {
+        'total_products': row.total_products,
+        'total_locations': row.total_locations,
+        'low_stock_alerts': int(row.low_stock_alerts),
+        'total_quantity': int(row.total_quantity),
+        'recent_transactions': row.recent_transactions
+    }
+
+
+def recent_activities(session, location_id=None, limit=10):
+    """Latest ledger rows with their product and location names"""
+    query = session.query(
+        StockTransaction,
+        Product,
+        Location
+    ).join(
+        Product, StockTransaction.product_id == Product.id
+    ).outerjoin(
+        Location, Location.id == StockTransaction.effective_location_id()
+    ).order_by(desc(StockTransaction.created_at), desc(StockTransaction.id))
+
+    if location_id:
+        query = query.filter(StockTransaction.involving_location(location_id))
+
+    activities = []
+    for transaction, product, location in query.limit(limit):
+        activities.append({
+            'id': transaction.id,
+            'type': transaction.transaction_type,
+            'product_name': product.name,
+            'product_sku': product.sku,
+            'location_name': location.name if location else None,
+            'quantity': transaction.quantity,
+            'notes': transaction.notes,
+            'created_at': transaction.created_at.isoformat() if transaction.created_at else None,
+            'created_by': transaction.user_id
+        })
+
+    return activities
+
+
+def low_stock_items(session, location_id=None, limit=5):
+    """Inventory rows furthest below their reorder point"""
+    query = session.query(
+        Inventory,
+        Product,
+        Location
+    ).join(
+        Product, Inventory.product_id == Product.id
+    ).join(
+        Location, Inventory.location_id == Location.id
+    ).filter(
+        Inventory.quantity <= Product.reorder_point
+    ).order_by(
+        (cast(Inventory.quantity, Float) / func.nullif(Product.reorder_point, 0)).asc(),
+        Inventory.id
+    )
+
+    if location_id:
+        query = query.filter(Inventory.location_id == location_id)
+
+    items = []
+    for inventory, product, location in query.limit(limit):
+        if product.reorder_point:
+            shortage_percentage = round((1 - inventory.quantity / product.reorder_point) * 100, 1)
+        else:
+            shortage_percentage = 100.0
+        items.append({
+            'product_id': product.id,
+            'product_name': product.name,
+            'sku': product.sku,
+            'location_name': location.name,
+            'current_quantity': inventory.quantity,
+            'reorder_point': product.reorder_point,
+            'shortage_percentage': shortage_percentage
+        })
+
+    return items
+
+
+def daily_usage_trend(session, location_id=None, days=TREND_DAYS):
+    """Total usage per day for the last few days, zero-filled"""
+    end_date = datetime.now().date()
+    start_date = end_date - timedelta(days=days - 1)
+
+    usage = _usage_by_day(session, location_id, start_date)
+    rows = session.query(
+        usage.c.count_date,
+        func.sum(usage.c.usage).label('total_usage')
+    ).filter(usage.c.count_date <= end_date).group_by(usage.c.count_date)
+
+    # Fill in missing dates with 0 usage
+    usage_by_date = {row.count_date: float(row.total_usage or 0) for row in rows}
+
+    trend_data = []
+    current_date = start_date
+    while current_date <= end_date:
+        trend_data.append({
+            'date': current_date.isoformat(),
+            'usage': usage_by_date.get(current_date, 0)
+        })
+        current_date += timedelta(days=1)
+
+    return trend_data
+
+
+def top_products(session, location_id=None, limit=5, days=TOP_PRODUCTS_DAYS):
+    """Products with the highest usage over a trailing window"""
+    since = datetime.now().date() - timedelta(days=days)
+
+    usage = _usage_by_day(session, location_id, since)
+    total_usage = func.sum(usage.c.usage)
+    rows = session.query(
+        Product.id,
+        Product.name,
+        Product.sku,
+        total_usage.label('total_usage')
+    ).join(
+        usage, usage.c.product_id == Product.id
+    ).group_by(
+        Product.id, Product.name, Product.sku
+    ).order_by(desc(total_usage), Product.id).limit(limit)
+
+    return [{
+        'product_id': row.id,
+        'product_name': row.name,
+        'sku': row.sku,
+        'total_usage': float(row.total_usage or 0)
+    } for row in rows]
+
+
+def _bundle_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=BUNDLE_WORKERS, thread_name_prefix='dashboard')
+    return _executor
+
+
+def _run_in_own_session(engine, section, location_id, kwargs):
+    with Session(engine) as session:
+        return section(session, location_id, **kwargs)
+
+
+def build_dashboard_bundle(location_id=None, activities_limit=10, low_stock_limit=5, top_products_limit=5):
+    """Every dashboard section in one result.
+
+    On PostgreSQL the sections run concurrently on a shared thread pool,
+    each in its own session and so on its own pooled connection, making
+    the wall time that of the slowest aggregate. Other backends (SQLite
+    serializes readers per connection anyway) run them in turn on the
+    request's session.
+    """
+    sections = {
+        'overview': (overview, {}),
+        'recent_activities': (recent_activities, {'limit': activities_limit}),
+        'low_stock_items': (low_stock_items, {'limit': low_stock_limit}),
+        'daily_usage_trend': (daily_usage_trend, {}),
+        'top_products': (top_products, {'limit': top_products_limit})
+    }
+
+    engine = db.engine
+    if engine.dialect.name != 'postgresql':
+        return {
+            name: section(db.session, location_id, **kwargs)
+            for name, (section, kwargs) in sections.items()
+        }
+
+    futures = {
+        # Each section runs in a copy of the request's context so its SQL is
+        # counted against the request in /api/metrics
+        name: _bundle_executor().submit(copy_context().run, _run_in_own_session, engine, section, location_id, kwargs)
+        for name, (section, kwargs) in sections.items()
+    }
+    return {name: future.result() for name, future in futures.items()}
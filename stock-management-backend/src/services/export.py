@@ -0,0 +1,132 @@
+import csv
+import io
+from src.models.stock_transaction import StockTransaction, db
+from src.models.product import Product
+from src.models.location import Location
+from src.models.user import User
+from datetime import date, datetime
+from decimal import Decimal
+from flask import Response, current_app, stream_with_context
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Rows fetched per round trip from the server-side cursor
+FETCH_BATCH_SIZE = 1000
+# Rows written before a chunk is handed to the server
+CHUNK_ROWS = 500
+
+
+def transaction_rows(location_id=None, product_id=None, transaction_type=None, start_dt=None, end_dt=None):
+    """Flat ledger rows with product, location and user names, newest first"""
+    from_location = aliased(Location)
+    to_location = aliased(Location)
+
+    stmt = select(
+        StockTransaction.id,
+        StockTransaction.created_at,
+        StockTransaction.transaction_type,
+        StockTransaction.product_id,
+        Product.sku,
+        Product.name.label('product_name'),
+        StockTransaction.quantity,
+        StockTransaction.from_location_id,
+        from_location.name.label('from_location_name'),
+        StockTransaction.to_location_id,
+        to_location.name.label('to_location_name'),
+        StockTransaction.user_id,
+        User.username,
+        StockTransaction.notes
+    ).join(
+        Product, StockTransaction.product_id == Product.id
+    ).outerjoin(
+        from_location, StockTransaction.from_location_id == from_location.id
+    ).outerjoin(
+        to_location, StockTransaction.to_location_id == to_location.id
+    ).outerjoin(
+        User, StockTransaction.user_id == User.id
+    )
+
+    if location_id:
+        stmt = stmt.where(StockTransaction.involving_location(location_id))
+    if product_id:
+        stmt = stmt.where(StockTransaction.product_id == product_id)
+    if transaction_type:
+        stmt = stmt.where(StockTransaction.transaction_type == transaction_type)
+    if start_dt:
+        stmt = stmt.where(StockTransaction.created_at >= start_dt)
+    if end_dt:
+        stmt = stmt.where(StockTransaction.created_at <= end_dt)
+
+    return stmt.order_by(StockTransaction.created_at.desc(), StockTransaction.id.desc())
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def _stream(stmt):
+    """Rows of a statement, fetched in batches over a server-side cursor"""
+    result = db.session.execute(stmt.execution_options(yield_per=FETCH_BATCH_SIZE))
+    try:
+        for row in result:
+            yield row
+    finally:
+        result.close()
+
+
+def _csv_chunks(stmt, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    # The header goes out before the query runs, so the first byte is immediate
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+
+    for count, row in enumerate(_stream(stmt), 1):
+        writer.writerow([_plain(value) for value in row])
+        if count % CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _ndjson_chunks(stmt, columns):
+    dumps = current_app.json.dumps
+    lines = []
+    for count, row in enumerate(_stream(stmt), 1):
+        lines.append(dumps(dict(zip(columns, map(_plain, row)))))
+        # The first row goes out on its own so the client sees data at once
+        if count == 1 or len(lines) == CHUNK_ROWS:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def export_response(stmt, export_format, filename):
+    """Stream a statement's rows as a CSV or NDJSON download.
+
+    Rows are fetched in batches with yield_per (a server-side cursor on
+    PostgreSQL) and written out chunk by chunk, so memory stays flat
+    whatever the date range.
+    """
+    columns = list(stmt.selected_columns.keys())
+    chunks = _csv_chunks if export_format == 'csv' else _ndjson_chunks
+
+    response = Response(
+        stream_with_context(chunks(stmt, columns)),
+        mimetype=EXPORT_FORMATS[export_format]
+    )
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}.{export_format}"'
+    return response
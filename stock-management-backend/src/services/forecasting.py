@@ -0,0 +1,191 @@
+import math
+from itertools import chain
+from datetime import datetime, timedelta
+from statistics import NormalDist
+from flask import current_app
+import numpy as np
+from sqlalchemy import Integer, cast, func, select
+from src.models.daily_count import DailyCount, db
+
+DEFAULT_HISTORY_DAYS = 56
+DEFAULT_ALPHA = 0.3
+DEFAULT_SERVICE_LEVEL = 0.95
+DEFAULT_LEAD_TIME_DAYS = 7
+# Weekday factors are pulled toward 1 as if each weekday had this many
+# extra average days, so a series counted twice on Mondays is not read
+# as having a Monday pattern
+SEASONAL_SHRINKAGE = 2.0
+# One-step errors from the first week are not used for sigma; the level
+# has not settled yet
+WARMUP_DAYS = 7
+# Smoothed level against the window's mean beyond which usage is trending
+TREND_BAND = 0.15
+
+
+def _day_offset(start_date):
+    """Whole days from start_date to a count's date"""
+    if db.engine.dialect.name == 'sqlite':
+        # Dates are text in SQLite; subtracting them would compare the years
+        return cast(func.julianday(DailyCount.count_date) - func.julianday(start_date), Integer)
+    return DailyCount.count_date - start_date
+
+
+def _load_history(start_date, end_date, location_ids=None):
+    """(location_id, product_id, day offset, usage) arrays from one query"""
+    query = select(
+        DailyCount.location_id,
+        DailyCount.product_id,
+        _day_offset(start_date),
+        DailyCount.calculated_usage
+    ).where(
+        DailyCount.count_date >= start_date,
+        DailyCount.count_date <= end_date,
+        DailyCount.calculated_usage.isnot(None)
+    )
+    if location_ids:
+        query = query.where(DailyCount.location_id.in_(location_ids))
+
+    # Every column is an integer, so the driver's tuples need no conversion;
+    # reading them from the cursor skips building a Row per count
+    result = db.session.connection().execute(query)
+    try:
+        rows = result.cursor.fetchall()
+    finally:
+        result.close()
+    if not rows:
+        return None
+    columns = np.fromiter(chain.from_iterable(rows), dtype=np.float64, count=4 * len(rows)).reshape(-1, 4)
+    return (
+        columns[:, 0].astype(np.int64),
+        columns[:, 1].astype(np.int64),
+        columns[:, 2].astype(np.int64),
+        columns[:, 3]
+    )
+
+
+def _smooth(values, observed, weekdays, alpha):
+    """Weekday-seasonal exponential smoothing of every column at once.
+
+    `values` is days × series with zeros where `observed` is False. Only
+    the loop over days is Python; each step is one vector operation across
+    all series. Returns (level, seasonal factors 7 × series, sigma, mean).
+    """
+    observed_f = observed.astype(np.float64)
+    weekday_onehot = np.eye(7)[weekdays]                  # days × 7
+    weekday_n = weekday_onehot.T @ observed_f             # 7 × series
+    weekday_sum = weekday_onehot.T @ values
+
+    n = weekday_n.sum(axis=0)
+    mean = values.sum(axis=0) / np.maximum(n, 1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        raw = weekday_sum / (weekday_n * mean)
+    raw = np.where((weekday_n > 0) & (mean > 0), raw, 1.0)
+    seasonal = (weekday_n * raw + SEASONAL_SHRINKAGE) / (weekday_n + SEASONAL_SHRINKAGE)
+    seasonal /= seasonal.mean(axis=0)
+
+    day_factors = seasonal[weekdays]                      # days × series
+    deseasonalized = values / day_factors
+    level = deseasonalized.sum(axis=0) / np.maximum(n, 1)
+
+    squared_error = np.zeros_like(level)
+    error_n = np.zeros_like(level)
+    for t in range(values.shape[0]):
+        seen = observed[t]
+        if t >= WARMUP_DAYS:
+            error = np.where(seen, values[t] - level * day_factors[t], 0.0)
+            squared_error += error * error
+            error_n += seen
+        level = np.where(seen, alpha * deseasonalized[t] + (1 - alpha) * level, level)
+
+    # Series too short for one-step errors use their spread instead
+    spread = np.sqrt((((values - mean) * observed_f) ** 2).sum(axis=0) / np.maximum(n, 1))
+    sigma = np.where(error_n > 0, np.sqrt(squared_error / np.maximum(error_n, 1)), spread)
+    return level, seasonal, sigma, mean
+
+
+class UsageForecast:
+    """Daily usage forecasts for every product × location series counted.
+
+    Arrays are aligned by series. `level` is the smoothed, deseasonalized
+    daily usage after `end_date`, `seasonal` its 7 × series weekday factors
+    (Monday first, averaging 1) and `sigma` the RMSE of one-day-ahead
+    forecasts over the history.
+    """
+
+    def __init__(self, location_ids, product_ids, level, seasonal, sigma, mean, end_date):
+        self.location_ids = location_ids
+        self.product_ids = product_ids
+        self.level = level
+        self.seasonal = seasonal
+        self.sigma = sigma
+        self.mean = mean
+        self.end_date = end_date
+
+    def demand(self, days):
+        """Expected usage over the `days` days after end_date, per series"""
+        weekdays = (self.end_date.weekday() + np.arange(1, days + 1)) % 7
+        return self.level * (np.bincount(weekdays, minlength=7) @ self.seasonal)
+
+    def safety_stock_by_product(self, days, service_level):
+        """Stock covering forecast error over `days` at the service level; {product_id: units}
+
+        Errors of a product's locations are taken as independent, so their
+        variances add.
+        """
+        z = NormalDist().inv_cdf(service_level)
+        variance = self.by_product(self.sigma ** 2)
+        return {product_id: z * math.sqrt(v * days) for product_id, v in variance.items()}
+
+    def by_product(self, values):
+        """Sum a per-series array over locations; {product_id: total}"""
+        products, index = np.unique(self.product_ids, return_inverse=True)
+        return dict(zip(products.tolist(), np.bincount(index, weights=values).tolist()))
+
+
+def forecast_usage(location_ids=None, history_days=None, alpha=None, as_of=None):
+    """Forecast usage for every counted series from one query and one vectorized pass.
+
+    History is the FORECAST_HISTORY_DAYS days up to `as_of` (today by
+    default). Days without a count are skipped rather than read as zero
+    usage. Returns None when nothing was counted.
+    """
+    config = current_app.config
+    history_days = history_days or config.get('FORECAST_HISTORY_DAYS', DEFAULT_HISTORY_DAYS)
+    alpha = alpha or config.get('FORECAST_ALPHA', DEFAULT_ALPHA)
+    end_date = as_of or datetime.now().date()
+    start_date = end_date - timedelta(days=history_days - 1)
+
+    history = _load_history(start_date, end_date, location_ids)
+    if history is None:
+        return None
+    locations, products, offsets, usage = history
+
+    # One column per series; negative usage (a recount that found more) is not demand
+    product_span = int(products.max()) + 1
+    keys = locations * product_span + products
+    series_keys, series = np.unique(keys, return_inverse=True)
+    values = np.zeros((history_days, len(series_keys)))
+    observed = np.zeros(values.shape, dtype=bool)
+    values[offsets, series] = np.maximum(usage, 0)
+    observed[offsets, series] = True
+
+    weekdays = (start_date.weekday() + np.arange(history_days)) % 7
+    level, seasonal, sigma, mean = _smooth(values, observed, weekdays, alpha)
+
+    return UsageForecast(
+        series_keys // product_span,
+        series_keys % product_span,
+        level, seasonal, sigma, mean, end_date
+    )
+
+
+def forecast_trend(level, mean):
+    """'rising', 'falling' or 'stable': a smoothed level against the history mean"""
+    if not level or not mean:
+        return 'falling' if mean else 'stable'
+    if level > mean * (1 + TREND_BAND):
+        return 'rising'
+    if level < mean * (1 - TREND_BAND):
+        return 'falling'
+    return 'stable'
@@ -0,0 +1,120 @@
+import logging
+import os
+import threading
+import time
+import psutil
+from sqlalchemy import text
+from src.services.clock import utc_now
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = 5
+DEFAULT_DB_TIMEOUT_MS = 2000
+# A sample older than this many intervals means the sampler is stuck
+STALE_AFTER_INTERVALS = 3
+
+
+def pool_status(engine):
+    """Connection pool figures, for the pool classes that keep them"""
+    pool = engine.pool
+    if hasattr(pool, 'checkedout'):
+        return {
+            'size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'checked_in': pool.checkedin(),
+            'overflow': pool.overflow()
+        }
+    return {'status': pool.status()}
+
+
+def probe_database(engine, timeout_ms):
+    """Run SELECT 1 on a pooled connection; return latency in ms"""
+    started = time.perf_counter()
+    with engine.connect() as connection:
+        if engine.dialect.name == 'postgresql':
+            # SET LOCAL ends with the probe's transaction, leaving the pooled connection as it was
+            connection.exec_driver_sql(f'SET LOCAL statement_timeout = {int(timeout_ms)}')
+        connection.execute(text('SELECT 1'))
+    return round((time.perf_counter() - started) * 1000, 3)
+
+
+class HealthSampler:
+    """Keeps system, pool and database figures fresh from a background thread.
+
+    Health endpoints read the latest sample, so a probe never waits on a
+    CPU measurement or a database round trip. The thread is started by the
+    first health request in each process, so it survives forking servers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sample = None
+        self._pid = None
+        self._interval = DEFAULT_INTERVAL
+
+    def latest(self, app, engine):
+        """The newest sample, starting the sampler in this process if needed"""
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._start(app, engine)
+        return self._sample
+
+    def is_stale(self, sample):
+        return time.monotonic() - sample['sampled_monotonic'] > self._interval * STALE_AFTER_INTERVALS
+
+    def _start(self, app, engine):
+        self._interval = app.config.get('HEALTH_SAMPLE_INTERVAL', DEFAULT_INTERVAL)
+        timeout_ms = app.config.get('HEALTH_DB_TIMEOUT_MS', DEFAULT_DB_TIMEOUT_MS)
+
+        # cpu_percent(interval=None) measures since the previous call; prime it
+        try:
+            psutil.cpu_percent(interval=None)
+        except Exception:
+            pass
+        # The first request is answered from a real sample rather than nothing
+        self._sample = self._take_sample(engine, timeout_ms)
+        self._pid = os.getpid()
+
+        thread = threading.Thread(
+            target=self._run, args=(engine, timeout_ms), name='health-sampler', daemon=True
+        )
+        thread.start()
+
+    def _run(self, engine, timeout_ms):
+        while True:
+            time.sleep(self._interval)
+            self._sample = self._take_sample(engine, timeout_ms)
+
+    def _take_sample(self, engine, timeout_ms):
+        sample = {
+            'sampled_at': utc_now().isoformat(),
+            'sampled_monotonic': time.monotonic(),
+        }
+
+        try:
+            sample['system'] = {
+                'cpu_percent': psutil.cpu_percent(interval=None),
+                'memory_percent': psutil.virtual_memory().percent,
+                'disk_percent': psutil.disk_usage('/').percent
+            }
+        except Exception as e:
+            sample['system'] = {'error': str(e)}
+
+        try:
+            sample['database_latency_ms'] = probe_database(engine, timeout_ms)
+            sample['database'] = 'connected'
+        except Exception as e:
+            logger.warning('Health database probe failed: %s', e)
+            sample['database'] = 'disconnected'
+            sample['database_error'] = str(e)
+
+        try:
+            sample['pool'] = pool_status(engine)
+        except Exception as e:
+            sample['pool'] = {'error': str(e)}
+
+        return sample
+
+
+health_sampler = HealthSampler()
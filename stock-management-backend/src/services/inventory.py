@@ -0,0 +1,306 @@
+from src.models.inventory import Inventory, db
+from src.models.product import Product
+from src.models.location import Location
+from src.models.stock_transaction import StockTransaction
+from sqlalchemy import case, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from src.services.cache import mark_locations_changed
+from src.services.stock_summary import apply_stock_changes
+from src.services.movements import record_movements
+
+MAX_RECEIPT_LINES = 2000
+SET_QUANTITY_RETRIES = 5
+
+_UPSERT_INSERTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert,
+}
+
+
+class InventoryError(Exception):
+    """Raised when a stock mutation cannot be applied"""
+
+
+class InsufficientStockError(InventoryError):
+    """Raised when a decrement would take stock below zero"""
+
+
+def ledger_entry(product_id, location_id, quantity, transaction_type, user_id, notes=None):
+    """Ledger row for a stock change at one location
+
+    Outflows (negative quantity) are booked against from_location_id and
+    inflows against to_location_id, so every row moves stock at exactly
+    one location.
+    """
+    return {
+        'product_id': product_id,
+        'from_location_id': location_id if quantity < 0 else None,
+        'to_location_id': location_id if quantity >= 0 else None,
+        'user_id': user_id,
+        'transaction_type': transaction_type,
+        'quantity': quantity,
+        'notes': notes or ''
+    }
+
+
+def write_ledger(rows, returning=False):
+    """Insert ledger rows; every StockTransaction write goes through here
+
+    Rows are sent as one multi-row INSERT and folded into the daily
+    movement rollup. With returning the inserted StockTransaction objects
+    are returned, which is only worth it for a handful of rows.
+    """
+    if not rows:
+        return []
+    mark_locations_changed(db.session, [
+        row['from_location_id'] or row['to_location_id'] for row in rows
+    ])
+    record_movements(rows)
+    stmt = insert(StockTransaction)
+    if returning:
+        if not db.engine.dialect.insert_returning:
+            # SQLite before 3.35 has no RETURNING; the ORM flush fetches ids per row
+            transactions = [StockTransaction(**row) for row in rows]
+            db.session.add_all(transactions)
+            db.session.flush()
+            return transactions
+        return list(db.session.scalars(stmt.returning(StockTransaction), rows))
+    db.session.execute(stmt, rows)
+    return []
+
+
+def _parse_receipt_lines(lines):
+    """Validate receipt lines into (product_id, quantity, notes) tuples"""
+    parsed = []
+    for index, line in enumerate(lines):
+        try:
+            product_id = int(line['product_id'])
+            quantity = int(line['quantity'])
+        except (KeyError, TypeError, ValueError):
+            raise InventoryError(f'Line {index}: product_id and quantity must be integers')
+        if quantity <= 0:
+            raise InventoryError(f'Line {index}: quantity must be positive')
+        parsed.append((product_id, quantity, line.get('notes')))
+    return parsed
+
+
+def _increment_inventory(location_id, quantities):
+    """Add quantities ({product_id: delta}) to a location's stock.
+
+    Existing rows are bumped with one UPDATE ... SET quantity = quantity +
+    CASE product_id ... END, missing ones created with one INSERT ... ON
+    CONFLICT (product_id, location_id) DO NOTHING RETURNING; rows that lost
+    a creation race to another writer are bumped on a second pass. Knowing
+    exactly which rows were created keeps the stock summary exact. Backends
+    without upsert/RETURNING fall back to a locked SELECT plus ORM writes.
+    Returns {product_id: new quantity}.
+    """
+    dialect = db.engine.dialect
+    upsert_insert = _UPSERT_INSERTS.get(dialect.name)
+    mark_locations_changed(db.session, [location_id])
+
+    if upsert_insert is None or not (dialect.insert_returning and dialect.update_returning):
+        return _increment_inventory_orm(location_id, quantities)
+
+    table = Inventory.__table__
+    on_hand = {}
+    changes = []
+    pending = dict(quantities)
+
+    while pending:
+        bumped = db.session.execute(
+            update(table).where(
+                table.c.location_id == location_id,
+                table.c.product_id.in_(pending)
+            ).values(
+                quantity=table.c.quantity + case(pending, value=table.c.product_id, else_=0)
+            ).returning(table.c.product_id, table.c.quantity)
+        )
+        for row in bumped:
+            changes.append((row.product_id, row.quantity - pending[row.product_id], row.quantity))
+            on_hand[row.product_id] = row.quantity
+
+        missing = {product_id: delta for product_id, delta in pending.items() if product_id not in on_hand}
+        if not missing:
+            break
+
+        created = db.session.execute(
+            upsert_insert(table).values([
+                {'product_id': product_id, 'location_id': location_id, 'quantity': delta}
+                for product_id, delta in missing.items()
+            ]).on_conflict_do_nothing(
+                index_elements=[table.c.product_id, table.c.location_id]
+            ).returning(table.c.product_id, table.c.quantity)
+        )
+        for row in created:
+            changes.append((row.product_id, None, row.quantity))
+            on_hand[row.product_id] = row.quantity
+
+        pending = {product_id: delta for product_id, delta in missing.items() if product_id not in on_hand}
+
+    apply_stock_changes(location_id, changes)
+    return on_hand
+
+
+def _increment_inventory_orm(location_id, quantities):
+    existing = {
+        inventory.product_id: inventory
+        for inventory in Inventory.query.filter(
+            Inventory.location_id == location_id,
+            Inventory.product_id.in_(quantities)
+        ).with_for_update().populate_existing()
+    }
+
+    changes = []
+    for product_id, delta in quantities.items():
+        if product_id in existing:
+            old_quantity = existing[product_id].quantity
+            existing[product_id].quantity += delta
+        else:
+            old_quantity = None
+            existing[product_id] = Inventory(product_id=product_id, location_id=location_id, quantity=delta)
+            db.session.add(existing[product_id])
+        changes.append((product_id, old_quantity, existing[product_id].quantity))
+    db.session.flush()
+
+    apply_stock_changes(location_id, changes)
+    return {product_id: inventory.quantity for product_id, inventory in existing.items()}
+
+
+def receive_stock(location_id, lines, user_id, notes=None):
+    """Book a whole supplier delivery into a location in one transaction.
+
+    Inventory rows are upserted with one UPDATE plus one INSERT and all
+    ledger rows with one multi-row INSERT, so a delivery costs a fixed number of
+    statements whatever its line count. Raises InventoryError, without
+    writing anything, if the location or any line is invalid.
+    """
+    try:
+        location_id = int(location_id)
+    except (TypeError, ValueError):
+        raise InventoryError('location_id must be an integer')
+    if db.session.get(Location, location_id) is None:
+        raise InventoryError(f'Unknown location id: {location_id}')
+
+    parsed = _parse_receipt_lines(lines)
+    if not parsed:
+        raise InventoryError('A receipt needs at least one line')
+
+    product_ids = {product_id for product_id, _, _ in parsed}
+    known_ids = {row.id for row in db.session.query(Product.id).filter(Product.id.in_(product_ids))}
+    unknown_ids = sorted(product_ids - known_ids)
+    if unknown_ids:
+        raise InventoryError(f'Unknown product ids: {unknown_ids}')
+
+    # Repeated products are summed into one change per inventory row
+    quantities = {}
+    for product_id, quantity, _ in parsed:
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+
+    try:
+        on_hand = _increment_inventory(location_id, quantities)
+        write_ledger([
+            ledger_entry(product_id, location_id, quantity, 'stock_in', user_id, line_notes or notes)
+            for product_id, quantity, line_notes in parsed
+        ])
+    except IntegrityError:
+        # A product or the location was deleted after it was checked
+        raise InventoryError('Unknown product or location')
+    db.session.commit()
+
+    return on_hand
+
+
+def change_quantity(product_id, location_id, delta):
+    """Atomically add delta to a location's stock and return the new quantity.
+
+    Decrements are one conditional UPDATE ... SET quantity = quantity + delta
+    WHERE quantity >= -delta, so concurrent movements of the same SKU can
+    never both take the last units; increments upsert the row. Raises
+    InsufficientStockError when there is not enough stock.
+    """
+    if delta >= 0:
+        return _increment_inventory(location_id, {product_id: delta})[product_id]
+
+    table = Inventory.__table__
+    mark_locations_changed(db.session, [location_id])
+    where = (
+        table.c.product_id == product_id,
+        table.c.location_id == location_id,
+        table.c.quantity >= -delta
+    )
+    stmt = update(table).where(*where).values(quantity=table.c.quantity + delta)
+
+    if db.engine.dialect.update_returning:
+        quantity = db.session.execute(stmt.returning(table.c.quantity)).scalar()
+    elif db.session.execute(stmt).rowcount:
+        # No UPDATE ... RETURNING (e.g. SQLite < 3.35); the row is write-locked
+        # by the UPDATE, so reading it back in the same transaction is safe
+        quantity = db.session.execute(
+            select(table.c.quantity).where(*where[:2])
+        ).scalar()
+    else:
+        quantity = None
+
+    if quantity is None:
+        raise InsufficientStockError('Insufficient stock')
+
+    apply_stock_changes(location_id, [(product_id, quantity - delta, quantity)])
+    return quantity
+
+
+def set_quantity(product_id, location_id, quantity):
+    """Set a location's stock to an absolute figure and return the change applied.
+
+    Compare-and-set on the previous value keeps the returned delta (and so
+    the ledger) exact even if another writer got in first.
+    """
+    table = Inventory.__table__
+    key = (table.c.product_id == product_id, table.c.location_id == location_id)
+    mark_locations_changed(db.session, [location_id])
+
+    for _ in range(SET_QUANTITY_RETRIES):
+        current = db.session.execute(select(table.c.quantity).where(*key)).scalar()
+        if current is None:
+            _increment_inventory(location_id, {product_id: 0})
+            continue
+
+        result = db.session.execute(
+            update(table).where(*key, table.c.quantity == current).values(quantity=quantity)
+        )
+        if result.rowcount:
+            apply_stock_changes(location_id, [(product_id, current, quantity)])
+            return quantity - current
+
+    raise InventoryError('Inventory changed concurrently, please retry')
+
+
+def transfer_stock(product_id, from_location_id, to_location_id, quantity, user_id, notes=None):
+    """Move stock between locations in one transaction
+
+    Both rows are changed with single SQL-side statements, taken in
+    location id order so opposite transfers cannot deadlock. Returns the
+    (transfer_out, transfer_in) ledger entries.
+    """
+    if quantity <= 0:
+        raise InventoryError('quantity must be positive')
+    if from_location_id == to_location_id:
+        raise InventoryError('Source and destination must differ')
+
+    deltas = {from_location_id: -quantity, to_location_id: quantity}
+    try:
+        for location_id in sorted(deltas):
+            change_quantity(product_id, location_id, deltas[location_id])
+    except IntegrityError:
+        raise InventoryError('Unknown product or location')
+
+    transfer_out, transfer_in = write_ledger([
+        ledger_entry(product_id, from_location_id, -quantity, 'transfer_out', user_id,
+                     notes or f'Transfer to location {to_location_id}'),
+        ledger_entry(product_id, to_location_id, quantity, 'transfer_in', user_id,
+                     notes or f'Transfer from location {from_location_id}')
+    ], returning=True)
+    db.session.commit()
+
+    return transfer_out, transfer_in
@@ -0,0 +1,68 @@
+from datetime import date, datetime, time
+from decimal import Decimal
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional; the standard library encoder is used instead
+    orjson = None
+
+# json.dumps arguments orjson has an equivalent for
+_ORJSON_ARGS = {'default', 'sort_keys', 'ensure_ascii', 'indent', 'separators'}
+
+
+def _default(value):
+    """Encode the types API payloads carry that JSON has no type for"""
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, tuple):
+        # Result rows and named tuples, which orjson only takes as plain tuples
+        return list(value)
+    return DefaultJSONProvider.default(value)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON provider that encodes with orjson when it is installed.
+
+    Dates are written as ISO 8601 and Decimals as numbers, the same as the
+    models' to_dict(), whichever encoder runs. Keys keep the order to_dict()
+    builds them in, and Thai text is written as UTF-8 rather than \\u
+    escapes, which roughly halves its size.
+    """
+
+    default = staticmethod(_default)
+    ensure_ascii = False
+    sort_keys = False
+
+    def _orjson_options(self, kwargs):
+        option = orjson.OPT_NON_STR_KEYS
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or not set(kwargs) <= _ORJSON_ARGS:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=_default, option=self._orjson_options(kwargs)).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(
+            obj, default=_default,
+            option=self._orjson_options({'indent': indent}) | orjson.OPT_APPEND_NEWLINE
+        )
+        # orjson already produced UTF-8 bytes; hand them over without a round trip through str
+        return self._app.response_class(body, mimetype=self.mimetype)
@@ -0,0 +1,191 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from flask import g, request
+from sqlalchemy import event
+
+# Upper bounds of the histogram buckets; +Inf is implied
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+SQL_COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250)
+
+UNMATCHED_ENDPOINT = 'unmatched'
+
+# SQL tally of the request being served, if any; see SqlTally
+_current_tally = ContextVar('sql_tally', default=None)
+
+
+class SqlTally:
+    """Statements and time spent in SQL on behalf of one request.
+
+    Work the request hands to other threads is counted too when it runs
+    in a copy of the request's context (contextvars.copy_context()).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.statements = 0
+        self.seconds = 0.0
+
+    def add(self, seconds):
+        with self._lock:
+            self.statements += 1
+            self.seconds += seconds
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def samples(self):
+        """Yield (le, cumulative count) pairs, ending with +Inf"""
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            yield ('+Inf' if bound == float('inf') else _number(bound)), total
+
+
+class RequestMetrics:
+    """Per-endpoint request and SQL figures for this worker process.
+
+    Each worker keeps its own figures, so behind several workers a scrape
+    sees the worker that answered it; compare rates rather than totals.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latency = {}
+        self._size = {}
+        self._sql_count = {}
+        self._requests = {}
+        self._sql_statements = {}
+        self._sql_seconds = {}
+
+    def observe(self, endpoint, method, status, seconds, size, tally):
+        request_key = (endpoint, method, str(status))
+        endpoint_key = (endpoint, method)
+        with self._lock:
+            self._requests[request_key] = self._requests.get(request_key, 0) + 1
+            self._latency.setdefault(endpoint_key, Histogram(LATENCY_BUCKETS)).observe(seconds)
+            if size is not None:
+                self._size.setdefault(endpoint_key, Histogram(SIZE_BUCKETS)).observe(size)
+            self._sql_count.setdefault(endpoint_key, Histogram(SQL_COUNT_BUCKETS)).observe(tally.statements)
+            self._sql_statements[endpoint_key] = self._sql_statements.get(endpoint_key, 0) + tally.statements
+            self._sql_seconds[endpoint_key] = self._sql_seconds.get(endpoint_key, 0.0) + tally.seconds
+
+    def render(self):
+        """The figures in the Prometheus text exposition format"""
+        with self._lock:
+            lines = []
+            _counter(lines, 'http_requests_total', 'Requests served, by endpoint, method and status.',
+                     ('endpoint', 'method', 'status'), self._requests)
+            _histogram(lines, 'http_request_duration_seconds', 'Time to build the response.',
+                       self._latency)
+            _histogram(lines, 'http_response_size_bytes', 'Response body size as sent (after compression).',
+                       self._size)
+            _histogram(lines, 'http_request_sql_statements', 'SQL statements executed per request.',
+                       self._sql_count)
+            _counter(lines, 'http_sql_statements_total', 'SQL statements executed, by endpoint.',
+                     ('endpoint', 'method'), self._sql_statements)
+            _counter(lines, 'http_sql_duration_seconds_total', 'Time spent executing SQL, by endpoint.',
+                     ('endpoint', 'method'), self._sql_seconds)
+        return '\n'.join(lines) + '\n'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def _counter(lines, name, help_text, label_names, values):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} counter')
+    for key, value in sorted(values.items()):
+        lines.append(f'{name}{_labels(label_names, key)} {_number(value)}')
+
+
+def _histogram(lines, name, help_text, histograms):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} histogram')
+    label_names = ('endpoint', 'method')
+    for key, histogram in sorted(histograms.items()):
+        for le, count in histogram.samples():
+            lines.append(f'{name}_bucket{_labels(label_names, key, [("le", le)])} {count}')
+        lines.append(f'{name}_sum{_labels(label_names, key)} {_number(histogram.sum)}')
+        lines.append(f'{name}_count{_labels(label_names, key)} {sum(histogram.counts)}')
+
+
+request_metrics = RequestMetrics()
+
+
+# The start time rides on the statement's execution context, which is
+# dropped with it; a statement that fails never reaches after_cursor_execute
+# and so leaves nothing behind on the pooled connection
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _current_tally.get() is not None:
+        context.metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    tally = _current_tally.get()
+    started = getattr(context, 'metrics_started', None)
+    if tally is not None and started is not None:
+        tally.add(time.perf_counter() - started)
+
+
+def init_metrics(app, db):
+    """Time every request and count the SQL it runs, per endpoint.
+
+    Register before init_compression() so response sizes are measured as
+    sent. The figures are served by GET /api/metrics.
+    """
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+    @app.before_request
+    def start_request_metrics():
+        g.metrics_started = time.perf_counter()
+        g.metrics_tally = SqlTally()
+        g.metrics_token = _current_tally.set(g.metrics_tally)
+
+    @app.after_request
+    def size_request_metrics(response):
+        g.metrics_status = response.status_code
+        # Streamed bodies have no length until they are sent
+        g.metrics_size = None if response.is_streamed else response.calculate_content_length()
+        return response
+
+    @app.teardown_request
+    def record_request_metrics(exc):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return
+        _current_tally.reset(g.pop('metrics_token'))
+        request_metrics.observe(
+            request.endpoint or UNMATCHED_ENDPOINT,
+            request.method,
+            g.get('metrics_status', 500),
+            time.perf_counter() - started,
+            g.get('metrics_size'),
+            g.pop('metrics_tally')
+        )
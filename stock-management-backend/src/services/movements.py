@@ -0,0 +1,171 @@
+from src.models.daily_stock_movement import DailyStockMovement, db
+from src.models.stock_transaction import StockTransaction
+from src.models.product import Product
+from src.models.location import Location
+from sqlalchemy import Date, cast, delete, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+GRANULARITIES = ('day', 'week', 'month')
+
+_UPSERT_INSERTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert,
+}
+
+
+def day_of(value):
+    """Calendar day of a timestamp expression"""
+    if db.engine.dialect.name == 'sqlite':
+        # SQLite keeps timestamps as text; CAST would read only the year
+        return func.date(value)
+    return cast(value, Date)
+
+
+def _period(day, granularity):
+    """First day of the day/week/month bucket a date falls in (weeks start Monday)"""
+    if granularity == 'day':
+        return day
+    if db.engine.dialect.name == 'sqlite':
+        if granularity == 'week':
+            return func.date(day, 'weekday 0', '-6 days')
+        return func.date(day, 'start of month')
+    return cast(func.date_trunc(granularity, day), Date)
+
+
+def record_movements(rows):
+    """Fold ledger rows being inserted now into today's rollup rows.
+
+    Rows are grouped in Python and applied with one INSERT ... ON
+    CONFLICT DO UPDATE, so the rollup costs one statement per ledger write
+    whatever its size. The day is taken from the database clock, as
+    StockTransaction.created_at is.
+    """
+    totals = {}
+    for row in rows:
+        key = (row['product_id'], row['from_location_id'] or row['to_location_id'], row['transaction_type'])
+        quantity, count = totals.get(key, (0, 0))
+        totals[key] = (quantity + row['quantity'], count + 1)
+
+    today = day_of(func.current_timestamp())
+    values = [{
+        'movement_date': today,
+        'product_id': product_id,
+        'location_id': location_id,
+        'transaction_type': transaction_type,
+        'total_quantity': quantity,
+        'transaction_count': count
+    } for (product_id, location_id, transaction_type), (quantity, count) in totals.items() if location_id]
+    if not values:
+        return
+
+    table = DailyStockMovement.__table__
+    upsert_insert = _UPSERT_INSERTS.get(db.engine.dialect.name)
+    if upsert_insert is None:
+        for value in values:
+            result = db.session.execute(update(table).where(
+                table.c.movement_date == today,
+                table.c.product_id == value['product_id'],
+                table.c.location_id == value['location_id'],
+                table.c.transaction_type == value['transaction_type']
+            ).values(
+                total_quantity=table.c.total_quantity + value['total_quantity'],
+                transaction_count=table.c.transaction_count + value['transaction_count']
+            ))
+            if not result.rowcount:
+                db.session.execute(insert(table).values(value))
+        return
+
+    stmt = upsert_insert(table).values(values)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[table.c.movement_date, table.c.location_id, table.c.product_id, table.c.transaction_type],
+        set_={
+            'total_quantity': table.c.total_quantity + stmt.excluded.total_quantity,
+            'transaction_count': table.c.transaction_count + stmt.excluded.transaction_count
+        }
+    ))
+
+
+def rebuild_daily_movements():
+    """Recompute the whole rollup from the ledger"""
+    location_id = StockTransaction.effective_location_id()
+    aggregate = select(
+        day_of(StockTransaction.created_at),
+        location_id,
+        StockTransaction.product_id,
+        StockTransaction.transaction_type,
+        func.sum(StockTransaction.quantity),
+        func.count(StockTransaction.id)
+    ).where(location_id.isnot(None)).group_by(
+        day_of(StockTransaction.created_at),
+        location_id,
+        StockTransaction.product_id,
+        StockTransaction.transaction_type
+    )
+
+    db.session.execute(delete(DailyStockMovement))
+    db.session.execute(
+        insert(DailyStockMovement).from_select(
+            ['movement_date', 'location_id', 'product_id', 'transaction_type',
+             'total_quantity', 'transaction_count'],
+            aggregate
+        )
+    )
+
+
+def ensure_daily_movements():
+    """Build the rollup once for databases that predate it"""
+    if DailyStockMovement.query.first() is None and StockTransaction.query.first() is not None:
+        rebuild_daily_movements()
+        db.session.commit()
+
+
+def movement_report(start_date, end_date, granularity='day', location_id=None, product_id=None):
+    """Movement totals per period, product, location and type from the rollup"""
+    period = _period(DailyStockMovement.movement_date, granularity)
+
+    query = db.session.query(
+        period.label('period'),
+        DailyStockMovement.product_id,
+        Product.name.label('product_name'),
+        Product.sku,
+        DailyStockMovement.location_id,
+        Location.name.label('location_name'),
+        DailyStockMovement.transaction_type,
+        func.sum(DailyStockMovement.total_quantity).label('total_quantity'),
+        func.sum(DailyStockMovement.transaction_count).label('transaction_count')
+    ).join(
+        Product, DailyStockMovement.product_id == Product.id
+    ).join(
+        Location, DailyStockMovement.location_id == Location.id
+    ).filter(
+        DailyStockMovement.movement_date >= start_date,
+        DailyStockMovement.movement_date <= end_date
+    )
+
+    if location_id:
+        query = query.filter(DailyStockMovement.location_id == location_id)
+
+    if product_id:
+        query = query.filter(DailyStockMovement.product_id == product_id)
+
+    query = query.group_by(
+        period,
+        DailyStockMovement.product_id,
+        Product.name,
+        Product.sku,
+        DailyStockMovement.location_id,
+        Location.name,
+        DailyStockMovement.transaction_type
+    ).order_by(period.desc(), DailyStockMovement.location_id, DailyStockMovement.product_id)
+
+    return [{
+        'period': row.period if isinstance(row.period, str) else row.period.isoformat(),
+        'product_id': row.product_id,
+        'product_name': row.product_name,
+        'sku': row.sku,
+        'location_id': row.location_id,
+        'location_name': row.location_name,
+        'transaction_type': row.transaction_type,
+        'total_quantity': int(row.total_quantity or 0),
+        'transaction_count': int(row.transaction_count or 0)
+    } for row in query]
@@ -0,0 +1,133 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from sqlalchemy import DateTime, String, and_, cast, literal, or_
+from sqlalchemy.dialects import sqlite
+
+
+class KeysetPage:
+    """One page of keyset results, shaped like Flask-SQLAlchemy's Pagination"""
+
+    def __init__(self, items, next_cursor, total=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.total = total
+
+
+def encode_cursor(values):
+    """Encode the sort key of the last row into an opaque cursor string"""
+    raw = json.dumps([v.isoformat() if isinstance(v, (date, datetime)) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, columns, as_text=None):
+    """Decode a cursor back into typed values, raising ValueError if malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (binascii.Error, UnicodeError, json.JSONDecodeError) as e:
+        raise ValueError('Invalid cursor') from e
+
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise ValueError('Invalid cursor')
+
+    decoded = []
+    for column, value, text in zip(columns, values, as_text or [False] * len(columns)):
+        if text:
+            # Stored text is used as it is; see _stored_as_text
+            if not isinstance(value, str):
+                raise ValueError('Invalid cursor')
+            try:
+                datetime.fromisoformat(value)
+            except ValueError as e:
+                raise ValueError('Invalid cursor') from e
+            decoded.append(value)
+            continue
+        python_type = column.type.python_type
+        if python_type in (datetime, date):
+            # Timestamps were encoded as ISO strings; anything else is forged
+            if not isinstance(value, str):
+                raise ValueError('Invalid cursor')
+            try:
+                value = python_type.fromisoformat(value)
+            except ValueError as e:
+                raise ValueError('Invalid cursor') from e
+        elif python_type is int:
+            # bool is an int subclass, but never a key
+            if not isinstance(value, int) or isinstance(value, bool):
+                raise ValueError('Invalid cursor')
+        elif python_type is str and not isinstance(value, str):
+            raise ValueError('Invalid cursor')
+        decoded.append(value)
+    return decoded
+
+
+def bind_stored(value):
+    """Bind a value in the format timestamp columns are stored in
+
+    SQLite keeps CURRENT_TIMESTAMP defaults as 'YYYY-MM-DD HH:MM:SS' text,
+    so whole-second datetimes are bound without a microsecond suffix to
+    compare against them. Rows written with a '.000000' suffix still
+    compare as text, which is why keyset paging seeks on the stored text.
+    """
+    if isinstance(value, datetime) and not value.microsecond:
+        return literal(value, DateTime().with_variant(sqlite.DATETIME(truncate_microseconds=True), 'sqlite'))
+    return value
+
+
+def _stored_as_text(query, column):
+    """Whether a sort column is compared as the text SQLite stored.
+
+    SQLite keeps timestamps as text in whatever format wrote them:
+    'YYYY-MM-DD HH:MM:SS' from CURRENT_TIMESTAMP, with a '.ffffff' suffix
+    from SQLAlchemy inserts. ORDER BY compares that text, so the seek must
+    compare the same text, or rows whose format differs from the bound
+    value are skipped.
+    """
+    return isinstance(column.type, DateTime) and query.session.get_bind().dialect.name == 'sqlite'
+
+
+def _seek(columns, values, as_text):
+    """Rows strictly after values when ordering by columns descending"""
+    column, value = columns[0], literal(values[0], String()) if as_text[0] else bind_stored(values[0])
+    if len(columns) == 1:
+        return column < value
+    return or_(column < value, and_(column == value, _seek(columns[1:], values[1:], as_text[1:])))
+
+
+def keyset_paginate(query, columns, cursor=None, per_page=50, with_total=False):
+    """Page through query ordered by columns descending, seeking past cursor.
+
+    Unlike paginate(), every page is an index range scan of per_page + 1
+    rows, so deep pages cost the same as the first one. The COUNT(*) over
+    the filtered set is only run when with_total is set.
+    """
+    total = query.order_by(None).count() if with_total else None
+    as_text = [_stored_as_text(query, column) for column in columns]
+
+    if cursor:
+        query = query.filter(_seek(columns, decode_cursor(cursor, columns, as_text), as_text))
+
+    # Timestamps compared as text go into the cursor exactly as stored
+    stored = [cast(column, String) for column, text in zip(columns, as_text) if text]
+    query = query.order_by(*[column.desc() for column in columns])
+    if stored:
+        query = query.add_columns(*stored)
+    rows = query.limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        if stored:
+            stored_values = iter(last[1:])
+            last = last[0]
+        next_cursor = encode_cursor([
+            next(stored_values) if text else getattr(last, column.key)
+            for column, text in zip(columns, as_text)
+        ])
+    if stored:
+        rows = [row[0] for row in rows]
+
+    return KeysetPage(rows, next_cursor, total)
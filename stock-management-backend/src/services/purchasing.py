@@ -0,0 +1,180 @@
+import math
+from src.models.inventory import Inventory, db
+from src.models.product import Product
+from src.models.location import Location
+from src.models.supplier import Supplier
+from src.models.daily_count import DailyCount
+from src.services.daily_counts import counted_usage
+from src.services.forecasting import DEFAULT_LEAD_TIME_DAYS, DEFAULT_SERVICE_LEVEL, forecast_trend, forecast_usage
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import and_, func
+
+USAGE_WINDOW_DAYS = 30
+SUPPLY_DAYS = 30
+
+
+def average_usage_subquery(since):
+    """Average positive daily usage per product since a date, as one GROUP BY"""
+    return db.session.query(
+        DailyCount.product_id.label('product_id'),
+        func.avg(DailyCount.calculated_usage).label('avg_daily_usage')
+    ).filter(
+        DailyCount.count_date >= since,
+        DailyCount.calculated_usage > 0
+    ).group_by(DailyCount.product_id).subquery()
+
+
+def build_purchase_suggestions(warehouse_id=None):
+    """Purchase suggestions for low-stock warehouse items, grouped by supplier.
+
+    The low-stock set and the usage aggregation are joined in a single
+    statement, so the cost is one round trip however many SKUs are below
+    their reorder point. Without a warehouse_id every warehouse-type
+    location is covered.
+
+    The quantity orders up to the forecast usage over the lead time plus
+    SUPPLY_DAYS, and safety stock for the FORECAST_SERVICE_LEVEL. Products
+    not counted in the forecast history have no forecast demand.
+    """
+    since = datetime.now().date() - timedelta(days=USAGE_WINDOW_DAYS)
+    usage = average_usage_subquery(since)
+    avg_daily_usage = func.coalesce(usage.c.avg_daily_usage, 0)
+
+    query = db.session.query(
+        Inventory.location_id,
+        Location.name.label('location_name'),
+        Inventory.quantity,
+        Product.id.label('product_id'),
+        Product.name.label('product_name'),
+        Product.sku,
+        Product.reorder_point,
+        Supplier.id.label('supplier_id'),
+        Supplier.name.label('supplier_name'),
+        Supplier.contact_person,
+        avg_daily_usage.label('avg_daily_usage')
+    ).join(Product, Inventory.product_id == Product.id).join(
+        Supplier, Product.supplier_id == Supplier.id
+    ).join(
+        Location, Inventory.location_id == Location.id
+    ).outerjoin(
+        usage, usage.c.product_id == Product.id
+    ).filter(
+        Inventory.quantity <= Product.reorder_point
+    )
+
+    if warehouse_id:
+        query = query.filter(Inventory.location_id == warehouse_id)
+    else:
+        query = query.filter(Location.location_type == 'warehouse')
+
+    query = query.order_by(Supplier.name, Product.name)
+    rows = query.all()
+
+    # Warehouses supply the stores, so a product's demand is its usage at every location
+    forecast = forecast_usage() if rows else None
+    daily_forecast, demand, safety_stock = {}, {}, {}
+    if forecast is not None:
+        cover_days = current_app.config.get('FORECAST_LEAD_TIME_DAYS', DEFAULT_LEAD_TIME_DAYS) + SUPPLY_DAYS
+        service_level = current_app.config.get('FORECAST_SERVICE_LEVEL', DEFAULT_SERVICE_LEVEL)
+        daily_forecast = forecast.by_product(forecast.demand(7) / 7)
+        demand = forecast.by_product(forecast.demand(cover_days))
+        safety_stock = forecast.safety_stock_by_product(cover_days, service_level)
+
+    suggestions_by_supplier = {}
+    for row in rows:
+        avg_usage = float(row.avg_daily_usage or 0)
+        product_demand = demand.get(row.product_id, 0.0)
+        product_safety_stock = safety_stock.get(row.product_id, 0.0)
+
+        # Reach the reorder point at least, otherwise order up to forecast demand plus safety stock
+        suggested_quantity = max(
+            (row.reorder_point or 0) - row.quantity,
+            math.ceil(product_demand + product_safety_stock - row.quantity),
+            0
+        )
+
+        if row.supplier_id not in suggestions_by_supplier:
+            suggestions_by_supplier[row.supplier_id] = {
+                'supplier_id': row.supplier_id,
+                'supplier_name': row.supplier_name,
+                'supplier_contact': row.contact_person,
+                'products': []
+            }
+
+        item = {
+            'product_id': row.product_id,
+            'product_name': row.product_name,
+            'sku': row.sku,
+            'location_id': row.location_id,
+            'location_name': row.location_name,
+            'current_quantity': row.quantity,
+            'reorder_point': row.reorder_point,
+            'avg_daily_usage': avg_usage,
+            'suggested_quantity': suggested_quantity,
+            'forecast_daily_usage': round(daily_forecast.get(row.product_id, 0.0), 2),
+            'forecast_demand': round(product_demand, 2),
+            'safety_stock': round(product_safety_stock, 2)
+        }
+        suggestions_by_supplier[row.supplier_id]['products'].append(item)
+
+    return list(suggestions_by_supplier.values())
+
+
+def build_usage_analysis(location_id=None, days=30):
+    """Usage per product over the last `days` days, heaviest first.
+
+    `usage_trend` is the high/medium/low band of the average daily usage.
+    Each product also gets its forecast daily usage for the coming week,
+    and `forecast_trend` says whether the smoothed level is rising,
+    falling or stable against the FORECAST_HISTORY_DAYS mean; a product
+    not counted in that history forecasts 0.0 and is stable.
+    """
+    end_date = datetime.now().date()
+    start_date = end_date - timedelta(days=days)
+
+    query = db.session.query(
+        Product.id.label('product_id'),
+        Product.name.label('product_name'),
+        Product.sku,
+        func.sum(counted_usage()).label('total_usage'),
+        func.avg(counted_usage()).label('avg_daily_usage'),
+        func.count(DailyCount.id).label('count_days')
+    ).select_from(Product).join(DailyCount).filter(
+        and_(
+            DailyCount.count_date >= start_date,
+            DailyCount.count_date <= end_date
+        )
+    )
+
+    if location_id:
+        query = query.filter(DailyCount.location_id == location_id)
+
+    query = query.group_by(Product.id, Product.name, Product.sku)
+    query = query.order_by(func.sum(counted_usage()).desc())
+    results = query.all()
+
+    forecast = forecast_usage(location_ids=[location_id] if location_id else None) if results else None
+    daily_forecast, level, history_mean = {}, {}, {}
+    if forecast is not None:
+        daily_forecast = forecast.by_product(forecast.demand(7) / 7)
+        level = forecast.by_product(forecast.level)
+        history_mean = forecast.by_product(forecast.mean)
+
+    analysis = []
+    for result in results:
+        avg_daily_usage = float(result.avg_daily_usage or 0)
+        item = {
+            'product_id': result.product_id,
+            'product_name': result.product_name,
+            'sku': result.sku,
+            'total_usage': float(result.total_usage or 0),
+            'avg_daily_usage': avg_daily_usage,
+            'count_days': result.count_days,
+            'usage_trend': 'high' if avg_daily_usage > 10 else 'medium' if avg_daily_usage > 5 else 'low',
+            'forecast_daily_usage': round(daily_forecast.get(result.product_id, 0.0), 2),
+            'forecast_trend': forecast_trend(level.get(result.product_id), history_mean.get(result.product_id))
+        }
+        analysis.append(item)
+
+    return analysis
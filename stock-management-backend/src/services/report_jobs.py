@@ -0,0 +1,258 @@
+import hashlib
+import json
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from src.models.report_job import ReportJob, db
+from src.services.clock import utc_now
+from src.services.movements import GRANULARITIES, movement_report
+from src.services.purchasing import build_purchase_suggestions, build_usage_analysis
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_PENDING = 20
+DEFAULT_REUSE_SECONDS = 300
+DEFAULT_TIMEOUT_SECONDS = 3600
+MAX_DAYS = 3650
+
+
+class ReportJobError(Exception):
+    """Raised when a report job request is invalid"""
+
+
+class ReportQueueFull(ReportJobError):
+    """Raised when too many report jobs are already waiting"""
+
+
+def _optional_int(params, name):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ReportJobError(f'{name} must be an integer')
+
+
+def _required_date(params, name):
+    try:
+        return date.fromisoformat(str(params[name])[:10])
+    except KeyError:
+        raise ReportJobError(f'{name} is required')
+    except ValueError:
+        raise ReportJobError(f'{name} must be a date (YYYY-MM-DD)')
+
+
+def _usage_analysis_params(params):
+    days = _optional_int(params, 'days') or 30
+    if not 1 <= days <= MAX_DAYS:
+        raise ReportJobError(f'days must be between 1 and {MAX_DAYS}')
+    return {'location_id': _optional_int(params, 'location_id'), 'days': days}
+
+
+def _purchase_suggestion_params(params):
+    return {'warehouse_id': _optional_int(params, 'warehouse_id')}
+
+
+def _inventory_movement_params(params):
+    granularity = params.get('granularity') or 'day'
+    if granularity not in GRANULARITIES:
+        raise ReportJobError('granularity must be day, week or month')
+    start_date = _required_date(params, 'start_date')
+    end_date = _required_date(params, 'end_date')
+    if end_date < start_date:
+        raise ReportJobError('end_date must not be before start_date')
+    return {
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'granularity': granularity,
+        'location_id': _optional_int(params, 'location_id'),
+        'product_id': _optional_int(params, 'product_id')
+    }
+
+
+def _run_inventory_movement(start_date, end_date, **kwargs):
+    return movement_report(date.fromisoformat(start_date), date.fromisoformat(end_date), **kwargs)
+
+
+# report_type -> (validate request params into canonical kwargs, build the report)
+REPORT_TYPES = {
+    'usage-analysis': (_usage_analysis_params, build_usage_analysis),
+    'purchase-suggestion': (_purchase_suggestion_params, build_purchase_suggestions),
+    'inventory-movement': (_inventory_movement_params, _run_inventory_movement),
+}
+
+
+class ReportJobRunner:
+    """Runs report jobs on a small thread pool, apart from request workers.
+
+    The pool is created lazily per process and bounded twice: at most
+    REPORT_JOB_WORKERS jobs run at once (and so hold at most that many
+    pooled connections), and submissions beyond REPORT_JOB_MAX_PENDING
+    jobs waiting for a worker are refused rather than queued without
+    limit. Running jobs do not count as waiting.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._waiting = 0
+
+    def submit(self, app, job_id):
+        max_pending = app.config.get('REPORT_JOB_MAX_PENDING', DEFAULT_MAX_PENDING)
+        with self._lock:
+            if self._waiting >= max_pending:
+                raise ReportQueueFull('Too many report jobs are waiting; try again shortly')
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=app.config.get('REPORT_JOB_WORKERS', DEFAULT_WORKERS),
+                    thread_name_prefix='report-job'
+                )
+            self._waiting += 1
+        self._executor.submit(self._run, app, job_id)
+
+    def _run(self, app, job_id):
+        with self._lock:
+            self._waiting -= 1
+        try:
+            with app.app_context():
+                run_job(job_id)
+        except Exception:
+            logger.exception('Report job %s could not be recorded', job_id)
+
+
+report_job_runner = ReportJobRunner()
+
+
+def run_job(job_id):
+    """Build a queued job's report and store the outcome; needs an app context"""
+    job = db.session.get(ReportJob, job_id)
+    if job is None or job.status != 'queued':
+        return
+    job.status = 'running'
+    job.started_at = utc_now()
+    db.session.commit()
+
+    _, build = REPORT_TYPES[job.report_type]
+    try:
+        result = current_app.json.dumps(build(**json.loads(job.params)))
+    except Exception as e:
+        db.session.rollback()
+        logger.exception('Report job %s failed', job_id)
+        job = db.session.get(ReportJob, job_id)
+        job.status = 'failed'
+        job.error = str(e)
+    else:
+        job.status = 'succeeded'
+        job.result = result
+    job.finished_at = utc_now()
+    db.session.commit()
+
+
+def _reusable(job, now):
+    if job.status in ('queued', 'running'):
+        timeout = current_app.config.get('REPORT_JOB_TIMEOUT', DEFAULT_TIMEOUT_SECONDS)
+        return now - (job.started_at or job.created_at) < timedelta(seconds=timeout)
+    if job.status == 'succeeded':
+        reuse = current_app.config.get('REPORT_JOB_REUSE_SECONDS', DEFAULT_REUSE_SECONDS)
+        return now - job.finished_at < timedelta(seconds=reuse)
+    return False
+
+
+def can_read_job(job, claims):
+    """Admins read every job; others their own, or one for their location"""
+    if claims is None or claims.get('role') == 'admin' or job.user_id == claims.get('uid'):
+        return True
+    params = json.loads(job.params)
+    location_id = params.get('location_id', params.get('warehouse_id'))
+    return location_id is not None and location_id == claims.get('loc')
+
+
+def submit_report_job(report_type, params, claims=None):
+    """Queue a report, or return the job already covering the same parameters.
+
+    Returns (job, created). A job that is queued, running, or finished
+    within REPORT_JOB_REUSE_SECONDS is shared by every identical request
+    whose user may read it (see can_read_job), so a burst of users opening
+    the same report costs one computation. A unique index allows one
+    queued or running job per report and parameters, so concurrent
+    identical submissions cannot both insert: the loser gets the winner's
+    job. `claims` are the submitter's token claims; None skips the check.
+    """
+    if report_type not in REPORT_TYPES:
+        raise ReportJobError(f"report_type must be one of: {', '.join(REPORT_TYPES)}")
+    validate, _ = REPORT_TYPES[report_type]
+    canonical = json.dumps(validate(params or {}), sort_keys=True, separators=(',', ':'))
+    params_hash = hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    now = utc_now()
+    latest = _latest_job(report_type, params_hash)
+    if latest is not None:
+        if _reusable(latest, now):
+            if can_read_job(latest, claims):
+                return latest, False
+            if latest.status in ('queued', 'running'):
+                # The single active job is someone else's; wait for it to finish
+                raise ReportQueueFull('The same report is being built for another user; try again shortly')
+        elif latest.status in ('queued', 'running'):
+            # Abandoned by a process that went away; free its slot in the unique index
+            latest.status = 'failed'
+            latest.error = 'Report job was abandoned'
+            latest.finished_at = now
+
+    job = ReportJob(
+        id=uuid.uuid4().hex,
+        report_type=report_type,
+        params=canonical,
+        params_hash=params_hash,
+        status='queued',
+        user_id=claims.get('uid') if claims else None,
+        created_at=now
+    )
+    db.session.add(job)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # An identical submission committed its job first
+        db.session.rollback()
+        latest = _latest_job(report_type, params_hash)
+        if latest is not None and can_read_job(latest, claims):
+            return latest, False
+        raise ReportQueueFull('The same report is being built for another user; try again shortly')
+
+    try:
+        report_job_runner.submit(current_app._get_current_object(), job.id)
+    except ReportQueueFull:
+        db.session.delete(job)
+        db.session.commit()
+        raise
+    return job, True
+
+
+def _latest_job(report_type, params_hash):
+    return ReportJob.query.filter_by(
+        report_type=report_type, params_hash=params_hash
+    ).order_by(ReportJob.created_at.desc()).first()
+
+
+def job_status(job):
+    """A job as returned to clients, with the report once it has succeeded"""
+    data = job.to_dict()
+    if job.status in ('queued', 'running') and not _reusable(job, utc_now()):
+        # The process running it went away (a restart or crash)
+        data['status'] = 'failed'
+        data['error'] = 'Report job was abandoned; submit it again'
+    if job.status == 'succeeded':
+        data['result'] = json.loads(job.result)
+    return data
+
+
+def purge_report_jobs(older_than_days):
+    """Delete jobs created more than `older_than_days` days ago; returns the count"""
+    cutoff = utc_now() - timedelta(days=older_than_days)
+    return ReportJob.query.filter(ReportJob.created_at < cutoff).delete(synchronize_session=False)
@@ -0,0 +1,193 @@
+import logging
+import time
+from src.models.product import Product, db
+from sqlalchemy import column, desc, func, literal_column, select, table, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+logger = logging.getLogger(__name__)
+
+# Trigram matching needs at least this many characters to use an index
+MIN_INDEXED_LENGTH = 3
+
+# FTS5 shadow table on SQLite; its rowid is the product id
+_product_search = table('product_search', column('rowid'), column('rank'))
+
+# Whether each engine has its search index (the SQLite shadow table or the
+# pg_trgm extension), with when that was checked. A missing index is looked
+# for again after INDEX_RECHECK_SECONDS, and a statement that finds it gone
+# drops the entry (_forget_missing_index)
+_index_ready = {}
+INDEX_RECHECK_SECONDS = 60
+
+_INDEX_CHECKS = {
+    'sqlite': "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'product_search'",
+    'postgresql': "SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'",
+}
+
+# Names that appear in the error when a statement uses a missing index:
+# the FTS table, or pg_trgm's similarity() function
+_MISSING_INDEX_MARKERS = ('product_search', 'similarity')
+
+
+def _like_pattern(search):
+    escaped = search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+
+def _index_enabled():
+    engine = db.engine
+    check = _INDEX_CHECKS.get(engine.dialect.name)
+    if check is None:
+        return False
+    ready, checked_at = _index_ready.get(engine, (False, None))
+    if checked_at is None or (not ready and time.monotonic() - checked_at > INDEX_RECHECK_SECONDS):
+        ready = db.session.execute(text(check)).first() is not None
+        _index_ready[engine] = (ready, time.monotonic())
+    return ready
+
+
+def _fts_enabled():
+    return db.engine.dialect.name == 'sqlite' and _index_enabled()
+
+
+def _trgm_enabled():
+    return db.engine.dialect.name == 'postgresql' and _index_enabled()
+
+
+def _forget_missing_index(error):
+    """True, and the cached check dropped, if error says the search index is gone"""
+    message = str(getattr(error, 'orig', error))
+    if not any(marker in message for marker in _MISSING_INDEX_MARKERS):
+        return False
+    logger.warning('Product search index unavailable (%s); using LIKE until it is back', message)
+    _index_ready.pop(db.engine, None)
+    return True
+
+
+def with_search_fallback(run):
+    """Call run(), a function that builds and executes a search query.
+
+    If the FTS table or pg_trgm was dropped, or is being rebuilt by another
+    process, after it was last seen, the failed statement is rolled back
+    and run() is called once more, when apply_product_search re-checks the
+    index and falls back to LIKE instead of failing the request.
+    """
+    try:
+        return run()
+    except (OperationalError, ProgrammingError) as e:
+        if not _forget_missing_index(e):
+            raise
+        db.session.rollback()
+        return run()
+
+
+def apply_product_search(query, search):
+    """Filter a query that selects from products to a search term, best match first.
+
+    Matching is a case-insensitive substring match on name or SKU, which
+    suits Thai names that have no word breaks. On PostgreSQL it is an ILIKE
+    served by pg_trgm GIN indexes and ranked by trigram similarity; on
+    SQLite an FTS5 trigram table is matched and ranked by bm25. Short
+    terms, and databases without the index, use a plain LIKE.
+    """
+    search = search.strip()
+    if not search:
+        return query
+
+    dialect = db.engine.dialect.name
+    indexed = len(search) >= MIN_INDEXED_LENGTH
+
+    if dialect == 'postgresql':
+        pattern = _like_pattern(search)
+        query = query.filter(
+            Product.name.ilike(pattern, escape='\\') | Product.sku.ilike(pattern, escape='\\')
+        )
+        if indexed and _trgm_enabled():
+            query = query.order_by(desc(func.greatest(
+                func.similarity(Product.name, search),
+                func.similarity(Product.sku, search)
+            )))
+        return query
+
+    if indexed and _fts_enabled():
+        phrase = '"' + search.replace('"', '""') + '"'
+        matches = select(
+            _product_search.c.rowid.label('product_id'),
+            _product_search.c.rank.label('rank')
+        ).where(literal_column('product_search').op('MATCH')(phrase)).subquery()
+        return query.join(matches, matches.c.product_id == Product.id).order_by(matches.c.rank)
+
+    pattern = _like_pattern(search)
+    return query.filter(
+        Product.name.ilike(pattern, escape='\\') | Product.sku.ilike(pattern, escape='\\')
+    )
+
+
+def index_product(product):
+    """Bring a product's search entry up to date after it was created or changed"""
+    if not _fts_enabled():
+        return
+    try:
+        db.session.execute(text('DELETE FROM product_search WHERE rowid = :id'), {'id': product.id})
+        db.session.execute(
+            text('INSERT INTO product_search (rowid, name, sku) VALUES (:id, :name, :sku)'),
+            {'id': product.id, 'name': product.name, 'sku': product.sku}
+        )
+    except OperationalError as e:
+        # SQLite fails the statement alone, so the product change still commits;
+        # rebuild-search-index catches the entry up once the table is back
+        if not _forget_missing_index(e):
+            raise
+
+
+def unindex_product(product_id):
+    """Drop a deleted product's search entry"""
+    if not _fts_enabled():
+        return
+    try:
+        db.session.execute(text('DELETE FROM product_search WHERE rowid = :id'), {'id': product_id})
+    except OperationalError as e:
+        if not _forget_missing_index(e):
+            raise
+
+
+def rebuild_search_index():
+    """Refill the SQLite search table from products"""
+    if not _fts_enabled():
+        return
+    db.session.execute(text('DELETE FROM product_search'))
+    db.session.execute(text('INSERT INTO product_search (rowid, name, sku) SELECT id, name, sku FROM products'))
+
+
+def ensure_search_index():
+    """Create the search indexes for the current backend; run from init-db"""
+    dialect = db.engine.dialect.name
+
+    if dialect == 'postgresql':
+        try:
+            db.session.execute(text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+            for name in ('name', 'sku'):
+                db.session.execute(text(
+                    f'CREATE INDEX IF NOT EXISTS ix_products_{name}_trgm '
+                    f'ON products USING gin ({name} gin_trgm_ops)'
+                ))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.warning('Trigram search indexes not created (%s); search will scan products', e)
+        _index_ready.pop(db.engine, None)
+
+    elif dialect == 'sqlite':
+        try:
+            db.session.execute(text(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS product_search USING fts5(name, sku, tokenize='trigram')"
+            ))
+        except Exception as e:
+            db.session.rollback()
+            logger.warning('FTS5 trigram search unavailable (%s); search will scan products', e)
+            return
+
+        _index_ready.pop(db.engine, None)
+        if db.session.execute(text('SELECT 1 FROM product_search LIMIT 1')).first() is None:
+            rebuild_search_index()
+        db.session.commit()
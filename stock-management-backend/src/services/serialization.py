@@ -0,0 +1,84 @@
+from sqlalchemy import inspect
+from sqlalchemy.orm import joinedload, selectinload
+
+
+def parse_fields(value):
+    """Parse a ``fields=id,quantity`` query value (None means every field)"""
+    if value is None:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+def parse_expand(value):
+    """Parse ``expand=product.brand,location`` into a nested dict
+
+    None means the model defaults; an empty string nests nothing.
+    """
+    if value is None:
+        return None
+    tree = {}
+    for path in value.split(','):
+        node = tree
+        for name in path.strip().split('.'):
+            if name:
+                node = node.setdefault(name, {})
+    return tree
+
+
+def serialization_args(args):
+    """Read the ``fields`` / ``expand`` contract from request args"""
+    return parse_fields(args.get('fields')), parse_expand(args.get('expand'))
+
+
+def nested_relations(model, fields=None, expand=None):
+    """Yield (relationship name, sub-expand) pairs to_dict() should nest.
+
+    With an explicit expand only the named relationships are nested. Without
+    one, the model's serialize_relations are nested unless a fieldset leaves
+    them out.
+    """
+    for name in getattr(model, 'serialize_relations', ()):
+        if expand is not None:
+            if name in expand:
+                yield name, expand[name]
+        elif fields is None or name in fields:
+            yield name, None
+
+
+def shape_dict(obj, data, fields=None, expand=None):
+    """Trim a to_dict() payload to a fieldset and nest related objects"""
+    if fields is not None:
+        data = {key: value for key, value in data.items() if key in fields}
+    for name, sub_expand in nested_relations(type(obj), fields, expand):
+        related = getattr(obj, name)
+        data[name] = related.to_dict(expand=sub_expand) if related else None
+    return data
+
+
+def eager_load_options(model, fields=None, expand=None):
+    """Build loader options for every relationship to_dict() will nest.
+
+    Many-to-one relationships are joined into the main SELECT, collections
+    are fetched with one SELECT ... IN per relationship, so serializing a
+    list costs a fixed number of queries.
+    """
+    return list(_plan(model, fields, expand, None))
+
+
+def _plan(model, fields, expand, parent):
+    mapper = inspect(model)
+    for name, sub_expand in nested_relations(model, fields, expand):
+        prop = mapper.relationships[name]
+        attr = getattr(model, name)
+        if parent is None:
+            loader = selectinload(attr) if prop.uselist else joinedload(attr)
+        elif prop.uselist:
+            loader = parent.selectinload(attr)
+        else:
+            loader = parent.joinedload(attr)
+
+        children = list(_plan(prop.mapper.class_, None, sub_expand, loader))
+        if children:
+            yield from children
+        else:
+            yield loader
@@ -0,0 +1,187 @@
+import json
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from logging.handlers import RotatingFileHandler
+from flask import has_request_context, request
+from sqlalchemy import event
+from src.services.clock import utc_now
+
+logger = logging.getLogger('stock.slow_queries')
+
+# Only statements that EXPLAIN accepts and never executes are explained
+EXPLAINABLE = ('select', 'with', 'insert', 'update', 'delete')
+
+MAX_STATEMENT_LENGTH = 10000
+MAX_LOGGED_PARAMETER_SETS = 5
+RATE_WINDOW_SECONDS = 60
+
+
+class RateLimit:
+    """Allow at most `limit` events per window, counting the ones dropped"""
+
+    def __init__(self, limit, window=RATE_WINDOW_SECONDS):
+        self.limit = limit
+        self.window = window
+        self._lock = threading.Lock()
+        self._window_start = time.monotonic()
+        self._count = 0
+        self._suppressed = 0
+
+    def acquire(self):
+        """Return (allowed, entries suppressed since the last allowed one)"""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._window_start >= self.window:
+                self._window_start = now
+                self._count = 0
+            if self._count >= self.limit:
+                self._suppressed += 1
+                return False, 0
+            self._count += 1
+            suppressed, self._suppressed = self._suppressed, 0
+            return True, suppressed
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, bytes):
+        return f'<{len(value)} bytes>'
+    return value
+
+
+def _loggable_parameters(parameters, executemany):
+    if executemany:
+        return [_loggable_parameters(each, False) for each in list(parameters)[:MAX_LOGGED_PARAMETER_SETS]]
+    if isinstance(parameters, dict):
+        return {key: _plain(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_plain(value) for value in parameters]
+    return parameters
+
+
+def explain(conn, statement, parameters):
+    """The plan of a statement, run on the connection that executed it.
+
+    SQLite reports EXPLAIN QUERY PLAN detail lines, PostgreSQL its EXPLAIN
+    text. A failing EXPLAIN is rolled back to a savepoint on PostgreSQL so
+    it cannot abort the request's transaction.
+    """
+    dialect = conn.dialect.name
+    if dialect == 'sqlite':
+        prefix, detail_column = 'EXPLAIN QUERY PLAN ', 3
+    else:
+        prefix, detail_column = 'EXPLAIN ', 0
+
+    savepoint = dialect == 'postgresql'
+    cursor = conn.connection.cursor()
+    try:
+        if savepoint:
+            cursor.execute('SAVEPOINT slow_query_explain')
+        try:
+            cursor.execute(prefix + statement, parameters)
+            plan = [str(row[detail_column]) for row in cursor.fetchall()]
+        except Exception as e:
+            if savepoint:
+                cursor.execute('ROLLBACK TO SAVEPOINT slow_query_explain')
+            return [f'EXPLAIN failed: {e}']
+        finally:
+            if savepoint:
+                cursor.execute('RELEASE SAVEPOINT slow_query_explain')
+        return plan
+    finally:
+        cursor.close()
+
+
+class SlowQueryLog:
+    """Log statements slower than a threshold, with their plan, as JSON lines"""
+
+    def __init__(self, threshold_ms, rate_limit, capture_plan=True):
+        self.threshold = threshold_ms / 1000
+        self.threshold_ms = threshold_ms
+        self.rate_limit = RateLimit(rate_limit)
+        self.capture_plan = capture_plan
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # On the statement's context, so a failed statement leaves nothing on the connection
+        if context is not None:
+            context.slow_query_started = time.perf_counter()
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, 'slow_query_started', None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        if elapsed < self.threshold:
+            return
+
+        allowed, suppressed = self.rate_limit.acquire()
+        if not allowed:
+            return
+
+        entry = {
+            'timestamp': utc_now().isoformat(timespec='milliseconds'),
+            'duration_ms': round(elapsed * 1000, 1),
+            'threshold_ms': self.threshold_ms,
+            'statement': statement[:MAX_STATEMENT_LENGTH],
+            'parameters': _loggable_parameters(parameters, executemany),
+            'executemany': executemany,
+            'endpoint': None,
+            'method': None,
+            'path': None,
+        }
+        if executemany:
+            entry['parameter_sets'] = len(parameters)
+        # Also true on dashboard bundle threads, which run in a copy of the request context
+        if has_request_context():
+            entry.update(endpoint=request.endpoint, method=request.method, path=request.full_path)
+        if self.capture_plan and not executemany and statement.lstrip().lower().startswith(EXPLAINABLE):
+            entry['plan'] = explain(conn, statement, parameters)
+        if suppressed:
+            entry['suppressed'] = suppressed
+
+        logger.warning(json.dumps(entry, ensure_ascii=False, default=str))
+
+
+def init_slow_query_log(app, db):
+    """Log statements slower than SLOW_QUERY_MS with their plan; off unless set.
+
+    Entries are JSON lines in SLOW_QUERY_LOG, rotated at
+    SLOW_QUERY_LOG_MAX_BYTES, and at most SLOW_QUERY_RATE_LIMIT are
+    written per minute so a regression cannot flood the disk. Each
+    entry says how many were dropped before it.
+    """
+    threshold_ms = app.config.get('SLOW_QUERY_MS')
+    if not threshold_ms:
+        return None
+
+    path = app.config.get('SLOW_QUERY_LOG', 'logs/slow_queries.log')
+    if not logger.handlers:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        handler = RotatingFileHandler(
+            path,
+            maxBytes=app.config.get('SLOW_QUERY_LOG_MAX_BYTES', 10 * 1024 * 1024),
+            backupCount=app.config.get('SLOW_QUERY_LOG_BACKUPS', 5),
+            encoding='utf-8'
+        )
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.WARNING)
+        logger.propagate = False
+
+    slow_log = SlowQueryLog(
+        threshold_ms,
+        app.config.get('SLOW_QUERY_RATE_LIMIT', 30),
+        capture_plan=app.config.get('SLOW_QUERY_EXPLAIN', True)
+    )
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', slow_log.before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', slow_log.after_cursor_execute)
+    return slow_log
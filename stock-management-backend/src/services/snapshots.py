@@ -0,0 +1,155 @@
+from src.models.inventory import Inventory, db
+from src.models.inventory_snapshot import InventorySnapshot, InventorySnapshotLine
+from src.models.product import Product
+from src.models.stock_transaction import StockTransaction
+from src.services.clock import utc_now
+from src.services.movements import day_of
+from src.services.pagination import bind_stored
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import and_, delete, func, insert, literal, select
+
+
+def _day_start(day):
+    return datetime.combine(day, time.min)
+
+
+def _ledger_deltas(*conditions):
+    """Net booked quantity per (location, product) over the matching ledger rows"""
+    location_id = StockTransaction.effective_location_id()
+    return select(
+        location_id.label('location_id'),
+        StockTransaction.product_id.label('product_id'),
+        func.sum(StockTransaction.quantity).label('delta')
+    ).where(location_id.isnot(None), *conditions).group_by(location_id, StockTransaction.product_id)
+
+
+def last_completed_day():
+    """Yesterday, on the database clock that stamps the ledger"""
+    today = db.session.execute(select(day_of(func.current_timestamp()))).scalar()
+    if isinstance(today, str):
+        today = date.fromisoformat(today)
+    return today - timedelta(days=1)
+
+
+def take_snapshot(snapshot_date=None):
+    """Record every location's stock at the end of a day (yesterday by default).
+
+    Figures are the live inventory minus everything booked after that day,
+    so taking the snapshot shortly after the boundary replays only a few
+    hours of ledger; retaking a day replaces it. Only non-zero figures are
+    stored. The caller commits.
+    """
+    snapshot_date = snapshot_date or last_completed_day()
+
+    existing = select(InventorySnapshot.id).where(InventorySnapshot.snapshot_date == snapshot_date)
+    db.session.execute(delete(InventorySnapshotLine).where(InventorySnapshotLine.snapshot_id.in_(existing)))
+    db.session.execute(delete(InventorySnapshot).where(InventorySnapshot.snapshot_date == snapshot_date))
+
+    snapshot = InventorySnapshot(snapshot_date=snapshot_date)
+    db.session.add(snapshot)
+    db.session.flush()
+
+    later = _ledger_deltas(
+        StockTransaction.created_at >= bind_stored(_day_start(snapshot_date + timedelta(days=1)))
+    ).subquery()
+    quantity = Inventory.quantity - func.coalesce(later.c.delta, 0)
+
+    db.session.execute(insert(InventorySnapshotLine).from_select(
+        ['snapshot_id', 'location_id', 'product_id', 'quantity'],
+        select(
+            literal(snapshot.id), Inventory.location_id, Inventory.product_id, quantity
+        ).select_from(Inventory).outerjoin(later, and_(
+            later.c.location_id == Inventory.location_id,
+            later.c.product_id == Inventory.product_id
+        )).where(quantity != 0)
+    ))
+    return snapshot
+
+
+def _snapshot_quantities(snapshot, location_id):
+    return dict(db.session.query(
+        InventorySnapshotLine.product_id, InventorySnapshotLine.quantity
+    ).filter(
+        InventorySnapshotLine.snapshot_id == snapshot.id,
+        InventorySnapshotLine.location_id == location_id
+    ))
+
+
+def stock_as_of(location_id, at):
+    """A location's stock on hand at a past moment, as {product_id: quantity}.
+
+    Starts from whichever known state is closest in time: the last
+    snapshot before the moment (replaying later ledger rows forward), the
+    first snapshot after it, or the live inventory (undoing later rows).
+    The cost is the ledger between that state and the moment, not the
+    whole history. `at` is naive UTC, like the ledger's created_at.
+    Returns (quantities, source description).
+    """
+    previous = InventorySnapshot.query.filter(
+        InventorySnapshot.snapshot_date <= at.date() - timedelta(days=1)
+    ).order_by(InventorySnapshot.snapshot_date.desc()).first()
+    following = InventorySnapshot.query.filter(
+        InventorySnapshot.snapshot_date >= at.date()
+    ).order_by(InventorySnapshot.snapshot_date).first()
+
+    # Each candidate is (distance in time, base, ledger conditions, direction, source)
+    at_bound = bind_stored(at)
+    candidates = [(
+        max(utc_now() - at, timedelta(0)), 'inventory',
+        [StockTransaction.created_at > at_bound], -1, {'type': 'inventory'}
+    )]
+    if previous:
+        boundary = _day_start(previous.snapshot_date + timedelta(days=1))
+        candidates.append((
+            at - boundary, previous,
+            [StockTransaction.created_at >= bind_stored(boundary), StockTransaction.created_at <= at_bound], 1,
+            {'type': 'snapshot', 'snapshot_date': previous.snapshot_date.isoformat()}
+        ))
+    if following:
+        boundary = _day_start(following.snapshot_date + timedelta(days=1))
+        candidates.append((
+            boundary - at, following,
+            [StockTransaction.created_at > at_bound, StockTransaction.created_at < bind_stored(boundary)], -1,
+            {'type': 'snapshot', 'snapshot_date': following.snapshot_date.isoformat()}
+        ))
+
+    _, base, conditions, direction, source = min(candidates, key=lambda candidate: candidate[0])
+
+    if base == 'inventory':
+        quantities = dict(db.session.query(Inventory.product_id, Inventory.quantity).filter(
+            Inventory.location_id == location_id
+        ))
+    else:
+        quantities = _snapshot_quantities(base, location_id)
+
+    deltas = _ledger_deltas(StockTransaction.involving_location(location_id), *conditions)
+    for row in db.session.execute(deltas):
+        if row.location_id == location_id:
+            quantities[row.product_id] = quantities.get(row.product_id, 0) + direction * row.delta
+
+    return quantities, source
+
+
+def stock_as_of_report(location_id, at):
+    """stock_as_of() with product names, omitting products with nothing on hand"""
+    quantities, source = stock_as_of(location_id, at)
+    on_hand = {product_id: quantity for product_id, quantity in quantities.items() if quantity}
+
+    items = []
+    if on_hand:
+        for product in db.session.query(Product.id, Product.name, Product.sku).filter(
+            Product.id.in_(on_hand)
+        ).order_by(Product.name):
+            items.append({
+                'product_id': product.id,
+                'product_name': product.name,
+                'sku': product.sku,
+                'quantity': on_hand[product.id]
+            })
+
+    return {
+        'location_id': location_id,
+        'as_of': at.isoformat(),
+        'source': source,
+        'items': items
+    }
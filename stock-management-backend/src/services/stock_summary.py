@@ -0,0 +1,101 @@
+from src.models.inventory import Inventory, db
+from src.models.product import Product
+from src.models.location_stock_summary import LocationStockSummary
+from sqlalchemy import case, delete, func, insert, select, update
+
+_reorder_point = func.coalesce(Product.reorder_point, 0)
+
+
+def apply_stock_changes(location_id, changes):
+    """Fold inventory changes at one location into its summary row.
+
+    changes is a list of (product_id, old_quantity, new_quantity) with
+    old_quantity None for newly created inventory rows. Must run in the
+    same transaction as the inventory writes it describes. The summary is
+    updated with a single relative UPDATE; a location that has no summary
+    row yet is rebuilt from its inventory instead.
+    """
+    if not changes:
+        return
+
+    reorder_points = dict(
+        db.session.query(Product.id, _reorder_point).filter(
+            Product.id.in_({product_id for product_id, _, _ in changes})
+        )
+    )
+
+    added_products = quantity_delta = low_stock_delta = 0
+    for product_id, old_quantity, new_quantity in changes:
+        reorder_point = reorder_points.get(product_id, 0)
+        if old_quantity is None:
+            added_products += 1
+        else:
+            quantity_delta -= old_quantity
+            low_stock_delta -= old_quantity <= reorder_point
+        quantity_delta += new_quantity
+        low_stock_delta += new_quantity <= reorder_point
+
+    table = LocationStockSummary.__table__
+    result = db.session.execute(
+        update(table).where(table.c.location_id == location_id).values(
+            total_products=table.c.total_products + added_products,
+            total_quantity=table.c.total_quantity + quantity_delta,
+            low_stock_count=table.c.low_stock_count + low_stock_delta
+        )
+    )
+    if not result.rowcount:
+        rebuild_stock_summary([location_id])
+
+
+def reorder_point_changed(product_id, old_reorder_point, new_reorder_point):
+    """Re-classify one product's inventory rows after its reorder point moved"""
+    old_reorder_point = old_reorder_point or 0
+    new_reorder_point = new_reorder_point or 0
+    if old_reorder_point == new_reorder_point:
+        return
+
+    inventory = Inventory.__table__
+    table = LocationStockSummary.__table__
+    delta = select(func.coalesce(func.sum(
+        case((inventory.c.quantity <= new_reorder_point, 1), else_=0) -
+        case((inventory.c.quantity <= old_reorder_point, 1), else_=0)
+    ), 0)).where(
+        inventory.c.product_id == product_id,
+        inventory.c.location_id == table.c.location_id
+    ).scalar_subquery()
+
+    db.session.execute(
+        update(table).where(
+            table.c.location_id.in_(select(inventory.c.location_id).where(inventory.c.product_id == product_id))
+        ).values(low_stock_count=table.c.low_stock_count + delta)
+    )
+
+
+def rebuild_stock_summary(location_ids=None):
+    """Recompute summary rows from inventory (all locations when None)"""
+    aggregate = select(
+        Inventory.location_id,
+        func.count(Inventory.id),
+        func.coalesce(func.sum(Inventory.quantity), 0),
+        func.coalesce(func.sum(case((Inventory.quantity <= _reorder_point, 1), else_=0)), 0)
+    ).join(Product, Inventory.product_id == Product.id).group_by(Inventory.location_id)
+
+    clear = delete(LocationStockSummary)
+    if location_ids is not None:
+        aggregate = aggregate.where(Inventory.location_id.in_(location_ids))
+        clear = clear.where(LocationStockSummary.location_id.in_(location_ids))
+
+    db.session.execute(clear)
+    db.session.execute(
+        insert(LocationStockSummary).from_select(
+            ['location_id', 'total_products', 'total_quantity', 'low_stock_count'],
+            aggregate
+        )
+    )
+
+
+def ensure_stock_summary():
+    """Build the summary once for databases that predate it"""
+    if LocationStockSummary.query.first() is None and Inventory.query.first() is not None:
+        rebuild_stock_summary()
+        db.session.commit()